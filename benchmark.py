@@ -0,0 +1,417 @@
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import tracemalloc
+
+import main
+
+TRACE_START = 1_700_000_000.0
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+def generate_trace(path, apps=50, hours=8.0, switch_interval=30.0, idle_every=3600.0, idle_length=900.0, seed=0, start=TRACE_START):
+    rng = random.Random(seed)
+    names = [f"app{i:06d}.exe" for i in range(apps)]
+    weights = [1.0 / (i + 1) for i in range(apps)]
+    end = start + hours * 3600
+    t = start
+    next_idle = start + rng.expovariate(1.0 / idle_every) if idle_every else end
+    events = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while t < end:
+            if t >= next_idle:
+                f.write(json.dumps({"t": t, "idle": 1}) + "\n")
+                t += idle_length
+                f.write(json.dumps({"t": t, "idle": 0, "app": rng.choices(names, weights)[0]}) + "\n")
+                next_idle = t + rng.expovariate(1.0 / idle_every)
+                events += 2
+            else:
+                f.write(json.dumps({"t": t, "app": rng.choices(names, weights)[0]}) + "\n")
+                events += 1
+            t += rng.expovariate(1.0 / switch_interval)
+        f.write(json.dumps({"t": end}) + "\n")
+    return names, events
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))] * 1e6
+    return {"count": len(s), "p50_us": pick(0.50), "p95_us": pick(0.95), "p99_us": pick(0.99), "max_us": s[-1] * 1e6}
+
+def timed(samples, fn):
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - t0)
+    return wrapper
+
+def run_case(apps, hours, switch_interval, mode, gui_refreshes=200, seed=0, metrics=False):
+    with tempfile.TemporaryDirectory(prefix="allseeingeye-bench-") as d:
+        trace = os.path.join(d, "trace.jsonl")
+        names, events = generate_trace(trace, apps, hours, switch_interval, seed=seed)
+        main.write_snapshot({n: 60.0 for n in names}, {n: TRACE_START for n in names}, 0, d)
+        if metrics:
+            with open(main.data_path(d, main.SETTINGS_FILE), "w", encoding="utf-8") as f:
+                json.dump({"metrics": 1}, f)
+        written = [0]
+        real_atomic_write_json = main.atomic_write_json
+        def counting_write(path, data, bak_path):
+            real_atomic_write_json(path, data, bak_path)
+            written[0] += os.path.getsize(path)
+        main.atomic_write_json = counting_write
+        try:
+            t0 = time.perf_counter()
+            tracker = main.AppTracker(main.ReplaySource(trace, mode), d)
+            load_s = time.perf_counter() - t0
+            written[0] = 0
+            ops = {"tick": [], "save": [], "gui_refresh": []}
+            tracker._observe = timed(ops["tick"], tracker._observe)
+            tracker._maybe_save = timed(ops["save"], tracker._maybe_save)
+            t0 = time.perf_counter()
+            tracker.track_loop()
+            tracker.stop()
+            replay_s = time.perf_counter() - t0
+            refresh = timed(ops["gui_refresh"], tracker.recent_rows)
+            for _ in range(gui_refreshes):
+                refresh(3)
+        finally:
+            main.atomic_write_json = real_atomic_write_json
+            main._metrics = None
+        total_bytes = written[0] + tracker.journal.bytes_written
+        return {
+            "apps": apps,
+            "mode": mode,
+            "events": events,
+            "load_ms": load_s * 1000,
+            "replay_s": replay_s,
+            "speedup": hours * 3600 / replay_s if replay_s else 0.0,
+            "wakeups_per_hour": tracker.scheduler.wakeups_per_hour(),
+            "bytes_per_hour": total_bytes / hours,
+            "ops": {name: percentiles(samples) for name, samples in ops.items()},
+            "writer": tracker.writer.stats(),
+        }
+
+def generate_rules(count, seed=0):
+    rng = random.Random(seed)
+    allow, block = [], []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            rule = f"app{i:06d}.exe"
+        elif kind == 1:
+            rule = f"tool{i:05d}*.exe"
+        elif kind == 2:
+            rule = f"C:\\Program Files\\Vendor{i}\\*"
+        else:
+            rule = f"re:game{i}_(x64|x86)\\.exe"
+        (block if rng.random() < 0.1 else allow).append(rule)
+    return allow, block
+
+def run_filter_case(rules, lookups=100000, distinct=500, seed=0):
+    rng = random.Random(seed)
+    allow, block = generate_rules(rules, seed)
+    t0 = time.perf_counter()
+    matcher = main.AppFilter(allow, block)
+    compile_s = time.perf_counter() - t0
+    apps = [(f"app{rng.randrange(rules * 2):06d}.exe", f"C:\\Program Files\\Vendor{rng.randrange(rules * 2)}\\bin.exe") for _ in range(distinct)]
+    cold, warm = [], []
+    for app, path in apps:
+        t0 = time.perf_counter()
+        matcher.decide(app, path)
+        cold.append(time.perf_counter() - t0)
+    for _ in range(lookups):
+        app, path = apps[rng.randrange(distinct)]
+        t0 = time.perf_counter()
+        matcher.decide(app, path)
+        warm.append(time.perf_counter() - t0)
+    return {"rules": rules, "compile_ms": compile_s * 1000, "cold": percentiles(cold), "warm": percentiles(warm), "stats": matcher.stats()}
+
+def print_filter_report(results):
+    print(f"{'rules':>7} {'compile ms':>11}  op      p50us     p95us     p99us     maxus")
+    for r in results:
+        head = f"{r['rules']:>7} {r['compile_ms']:>11.1f}"
+        for i, name in enumerate(("cold", "warm")):
+            p = r[name]
+            prefix = head if i == 0 else " " * len(head)
+            print(f"{prefix}  {name:<5} {p['p50_us']:>8.2f} {p['p95_us']:>9.2f} {p['p99_us']:>9.2f} {p['max_us']:>9.2f}")
+
+def measure(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, kept
+
+def run_title_memory_case(titles, apps=20, observations=10, seed=0):
+    rng = random.Random(seed)
+    obs = []
+    for i in range(titles * observations):
+        title = i % titles if i < titles else rng.randrange(titles)
+        obs.append((f"app{title % apps:03d}.exe", f"Document {title:07d} - Project {title % 97}", TRACE_START + i))
+    def build_dicts():
+        data, last_used = {}, {}
+        for app, title, t in obs:
+            key = f"{app}|{title}"
+            data[key] = data.get(key, 0) + 1.0
+            last_used[key] = t
+        return data, last_used
+    def build_store():
+        store = main.TitleStore()
+        for app, title, t in obs:
+            store.add(app, title, t - 1.0, t)
+        return store
+    dict_bytes, (data, last_used) = measure(build_dicts)
+    store_bytes, store = measure(build_store)
+    entries = len(store)
+    return {
+        "titles": titles,
+        "entries": entries,
+        "observations": len(obs),
+        "dict_bytes_per_entry": dict_bytes / entries,
+        "store_bytes_per_entry": store_bytes / entries,
+        "dict_file_bytes_per_entry": len(json.dumps({"data": data, "last_used": last_used})) / entries,
+        "store_file_bytes_per_entry": len(store.to_bytes()) / entries,
+    }
+
+def print_title_memory_report(results):
+    print(f"{'titles':>8} {'entries':>8} {'dict B/entry':>13} {'store B/entry':>14} {'json B/entry':>13} {'bin B/entry':>12}")
+    for r in results:
+        print(f"{r['titles']:>8} {r['entries']:>8} {r['dict_bytes_per_entry']:>13.1f} {r['store_bytes_per_entry']:>14.1f} {r['dict_file_bytes_per_entry']:>13.1f} {r['store_file_bytes_per_entry']:>12.1f}")
+
+def run_segment_case(rows, apps=200, seed=0):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix="allseeingeye-bench-") as d:
+        store = main.SegmentStore(main.Path(d, "segments"))
+        intervals = []
+        t = TRACE_START
+        for _ in range(rows):
+            duration = rng.expovariate(1.0 / 30.0)
+            app = f"app{int(rng.paretovariate(1.2)) % apps:06d}.exe"
+            intervals.append([app, t, t + duration])
+            t += duration
+        t0 = time.perf_counter()
+        for i in range(0, rows, main.SEGMENT_ROWS):
+            main.write_segment(main.Path(d, "segments", f"seg-{i // main.SEGMENT_ROWS + 1:06d}.ase"), [tuple(r) for r in intervals[i:i + main.SEGMENT_ROWS]])
+        write_s = time.perf_counter() - t0
+        json_path = os.path.join(d, "intervals.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(intervals, f)
+        del intervals
+        lo, hi = TRACE_START + (t - TRACE_START) * 0.25, TRACE_START + (t - TRACE_START) * 0.75
+        t0 = time.perf_counter()
+        with open(json_path, encoding="utf-8") as f:
+            loaded = json.load(f)
+        totals = {}
+        for app, s, e in loaded:
+            overlap = min(e, hi) - max(s, lo)
+            if overlap > 0:
+                totals[app] = totals.get(app, 0.0) + overlap
+        json_s = time.perf_counter() - t0
+        del loaded
+        timings = {}
+        for name, args in (("all", (None, None)), ("half", (lo, hi))):
+            t0 = time.perf_counter()
+            result = store.totals(*args)
+            timings[name] = time.perf_counter() - t0
+        drift = max(abs(result.get(app, 0.0) - secs) for app, secs in totals.items())
+        segment_bytes = sum(p.stat().st_size for p in store.files())
+        json_bytes = os.path.getsize(json_path)
+        store.close()
+    return {
+        "rows": rows,
+        "write_ms": write_s * 1000,
+        "json_ms": json_s * 1000,
+        "mmap_all_ms": timings["all"] * 1000,
+        "mmap_range_ms": timings["half"] * 1000,
+        "max_drift_s": drift,
+        "segment_bytes_per_row": segment_bytes / rows,
+        "json_bytes_per_row": json_bytes / rows,
+    }
+
+def run_fleet_case(machines, apps=2000, per_machine=100, workers=None, seed=0):
+    rng = random.Random(seed)
+    names = [f"app{i:06d}.exe" for i in range(apps)]
+    with tempfile.TemporaryDirectory(prefix="allseeingeye-bench-") as d:
+        paths = []
+        expected = {}
+        for m in range(machines):
+            machine_dir = os.path.join(d, "in", f"host{m:06d}")
+            os.makedirs(machine_dir)
+            chosen = rng.sample(names, min(per_machine, apps))
+            data = {app: rng.uniform(1, 36000) for app in chosen}
+            last_used = {app: TRACE_START + rng.uniform(0, 86400) for app in chosen}
+            for app, seconds in data.items():
+                expected[app] = expected.get(app, 0.0) + seconds
+            with open(os.path.join(machine_dir, "data.json"), "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            with open(os.path.join(machine_dir, "last_used.json"), "w", encoding="utf-8") as f:
+                json.dump(last_used, f)
+            paths.append(machine_dir)
+        store = main.FleetStore(os.path.join(d, "fleet"), workers)
+        t0 = time.perf_counter()
+        store.ingest(paths)
+        ingest_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        merged = {app: total for app, total, _ in store.merged()}
+        merge_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        store.ingest(paths)
+        reingest_s = time.perf_counter() - t0
+        again = {app: total for app, total, _ in store.merged()}
+    return {
+        "machines": machines,
+        "apps": len(merged),
+        "ingest_s": ingest_s,
+        "merge_s": merge_s,
+        "reingest_s": reingest_s,
+        "max_drift_s": max(abs(merged.get(app, 0.0) - secs) for app, secs in expected.items()),
+        "reingest_drift_s": max(abs(again[app] - merged[app]) for app in merged),
+    }
+
+def run_table_case(apps, ticks=2000, changes_per_tick=2, seed=0):
+    rng = random.Random(seed)
+    model = main.AppTableModel()
+    names = [f"app{i:06d}.exe" for i in range(apps)]
+    rows = [(app, rng.uniform(0, 360000), TRACE_START + rng.uniform(0, 86400), rng.uniform(0, 3600) if rng.random() < 0.05 else 0.0) for app in names]
+    t0 = time.perf_counter()
+    model.load(rows)
+    load_s = time.perf_counter() - t0
+    samples = []
+    now = TRACE_START + 86400
+    for tick in range(ticks):
+        now += 1
+        t0 = time.perf_counter()
+        for _ in range(changes_per_tick):
+            app = rng.choice(names)
+            total, _, today = model.rows.get(app, (0.0, None, 0.0))
+            model.update(app, (total + 1, now, today + 1))
+        for row in model.window(rng.randrange(max(1, apps - main.APP_TABLE_ROWS)), main.APP_TABLE_ROWS):
+            model.format(row, now)
+        samples.append(time.perf_counter() - t0)
+    sort_s = []
+    for column in main.APP_TABLE_COLUMNS:
+        t0 = time.perf_counter()
+        model.sort(column, column != "app")
+        sort_s.append(time.perf_counter() - t0)
+    return {"apps": apps, "load_ms": load_s * 1000, "sort_ms": max(sort_s) * 1000, "frame": percentiles(samples)}
+
+def print_table_report(results):
+    print(f"{'apps':>7} {'load ms':>9} {'sort ms':>9} {'frame p50us':>12} {'p95us':>9} {'p99us':>9} {'maxus':>9}")
+    for r in results:
+        f = r["frame"]
+        print(f"{r['apps']:>7} {r['load_ms']:>9.1f} {r['sort_ms']:>9.1f} {f['p50_us']:>12.1f} {f['p95_us']:>9.1f} {f['p99_us']:>9.1f} {f['max_us']:>9.1f}")
+
+def print_fleet_report(results):
+    print(f"{'machines':>9} {'apps':>6} {'ingest s':>9} {'merge s':>8} {'reingest s':>11} {'drift s':>9} {'reingest drift':>15}")
+    for r in results:
+        print(f"{r['machines']:>9} {r['apps']:>6} {r['ingest_s']:>9.2f} {r['merge_s']:>8.2f} {r['reingest_s']:>11.2f} {r['max_drift_s']:>9.2g} {r['reingest_drift_s']:>15.2g}")
+
+def run_cold_case(rows, apps=200, seed=0):
+    rng = random.Random(seed)
+    intervals = []
+    t = TRACE_START
+    for _ in range(rows):
+        duration = round(rng.expovariate(1.0 / 30.0) * 4) / 4
+        intervals.append((f"app{int(rng.paretovariate(1.2)) % apps:06d}.exe", t, t + duration))
+        t += duration + (rng.random() < 0.05) * rng.expovariate(1.0 / 600.0)
+    with tempfile.TemporaryDirectory(prefix="allseeingeye-bench-") as d:
+        json_path = os.path.join(d, "intervals.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(intervals, f)
+        segment_path = main.Path(d, "seg-000001.ase")
+        main.write_segment(segment_path, list(intervals))
+        result = {"rows": rows, "json_bytes_per_row": os.path.getsize(json_path) / rows, "segment_bytes_per_row": segment_path.stat().st_size / rows}
+        lo, hi = TRACE_START + (t - TRACE_START) * 0.3 + 1234, TRACE_START + (t - TRACE_START) * 0.6
+        for codec in main.COLD_CODECS:
+            store = main.ColdStore(main.Path(d, codec), codec)
+            t0 = time.perf_counter()
+            store.seal(list(intervals), t + 1)
+            seal_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            store.totals(lo, hi)
+            range_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            scanned = sum(1 for _ in store.intervals())
+            scan_s = time.perf_counter() - t0
+            result[codec] = {"bytes_per_row": store.size() / rows, "seal_ms": seal_s * 1000, "range_ms": range_s * 1000, "scan_ms": scan_s * 1000, "blocks": len(store.blocks), "scanned": scanned}
+    return result
+
+def print_cold_report(results):
+    print(f"{'rows':>9} {'json B/row':>11} {'seg B/row':>10}  codec  {'B/row':>6} {'blocks':>7} {'seal ms':>9} {'range ms':>9} {'scan ms':>9}")
+    for r in results:
+        head = f"{r['rows']:>9} {r['json_bytes_per_row']:>11.1f} {r['segment_bytes_per_row']:>10.1f}"
+        for i, codec in enumerate(main.COLD_CODECS):
+            c = r[codec]
+            print(f"{head if i == 0 else ' ' * len(head)}  {codec:<5} {c['bytes_per_row']:>6.2f} {c['blocks']:>7} {c['seal_ms']:>9.1f} {c['range_ms']:>9.2f} {c['scan_ms']:>9.1f}")
+
+def print_segment_report(results):
+    print(f"{'rows':>9} {'write ms':>9} {'json ms':>9} {'mmap all':>9} {'mmap 50%':>9} {'seg B/row':>10} {'json B/row':>11}")
+    for r in results:
+        print(f"{r['rows']:>9} {r['write_ms']:>9.1f} {r['json_ms']:>9.1f} {r['mmap_all_ms']:>9.2f} {r['mmap_range_ms']:>9.1f} {r['segment_bytes_per_row']:>10.1f} {r['json_bytes_per_row']:>11.1f}")
+
+def print_report(results):
+    print(f"{'apps':>7} {'mode':>5} {'events':>7} {'load ms':>9} {'speedup':>9} {'wake/h':>8} {'bytes/h':>10} {'wr p95ms':>9}  op            p50us     p95us     p99us     maxus")
+    for r in results:
+        head = f"{r['apps']:>7} {r['mode']:>5} {r['events']:>7} {r['load_ms']:>9.1f} {r['speedup']:>8.0f}x {r['wakeups_per_hour']:>8.0f} {r['bytes_per_hour']:>10.0f} {r['writer']['write_ms_p95']:>9.2f}"
+        for i, (name, p) in enumerate(r["ops"].items()):
+            prefix = head if i == 0 else " " * len(head)
+            if p["count"]:
+                print(f"{prefix}  {name:<12} {p['p50_us']:>8.1f} {p['p95_us']:>9.1f} {p['p99_us']:>9.1f} {p['max_us']:>9.1f}")
+            else:
+                print(f"{prefix}  {name:<12} {'-':>8}")
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Replay synthetic traces through AppTracker on an accelerated clock.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--switch-interval", type=float, default=30.0)
+    parser.add_argument("--mode", choices=["push", "poll"], default="poll")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--metrics", action="store_true", help="run the replay with hot-path metrics enabled to measure their overhead")
+    parser.add_argument("--filter-rules", type=int, nargs="+", help="benchmark the whitelist/blocklist matcher at these rule counts instead")
+    parser.add_argument("--title-memory", type=int, nargs="+", help="compare per-title storage against plain dicts at these distinct-title counts instead")
+    parser.add_argument("--segment-rows", type=int, nargs="+", help="compare mmap segment aggregation against parsing JSON at these interval counts instead")
+    parser.add_argument("--fleet-machines", type=int, nargs="+", help="benchmark merging this many synthetic machine data directories instead")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--cold-rows", type=int, nargs="+", help="compare compressed cold blocks against segments and JSON at these interval counts instead")
+    parser.add_argument("--table-rows", type=int, nargs="+", help="time incremental app-table frame updates at these app counts instead")
+    args = parser.parse_args(argv)
+    if args.cold_rows:
+        results = [run_cold_case(n, seed=args.seed) for n in args.cold_rows]
+        report = print_cold_report
+    elif args.table_rows:
+        results = [run_table_case(n, seed=args.seed) for n in args.table_rows]
+        report = print_table_report
+    elif args.fleet_machines:
+        results = [run_fleet_case(n, workers=args.workers, seed=args.seed) for n in args.fleet_machines]
+        report = print_fleet_report
+    elif args.filter_rules:
+        results = [run_filter_case(n, seed=args.seed) for n in args.filter_rules]
+        report = print_filter_report
+    elif args.segment_rows:
+        results = [run_segment_case(n, seed=args.seed) for n in args.segment_rows]
+        report = print_segment_report
+    elif args.title_memory:
+        results = [run_title_memory_case(n, seed=args.seed) for n in args.title_memory]
+        report = print_title_memory_report
+    else:
+        results = [run_case(n, args.hours, args.switch_interval, args.mode, seed=args.seed, metrics=args.metrics) for n in args.sizes]
+        report = print_report
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        report(results)
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,32 +1,82 @@
 import sys
 import os
 import time
+_STARTUP_T0 = time.perf_counter()
 import json
+import re
+import fnmatch
 import threading
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import win32gui
-import win32process
-import win32event
-import win32api
-import winerror
-import psutil
-import pystray
-from PIL import Image, ImageDraw
+import datetime
 import ctypes
+import queue
+import struct
+from array import array
+from collections import OrderedDict, namedtuple, deque
 from pathlib import Path
 
+tk = filedialog = messagebox = ttk = pystray = None
+_tray_image = None
+_metrics = None
+
+def load_gui_modules():
+    global tk, filedialog, messagebox, ttk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+
+def load_tray_modules():
+    global pystray
+    import pystray
+
+def show_message(kind, title, text):
+    try:
+        from tkinter import messagebox
+        getattr(messagebox, kind)(title, text)
+    except:
+        pass
+
 def get_tray_image():
-    if ICON_PATH.exists():
-        try:
-            return Image.open(str(ICON_PATH)).resize((64, 64), Image.LANCZOS)
-        except:
-            pass
+    global _tray_image
+    if _tray_image is not None:
+        return _tray_image
+    from PIL import Image, ImageDraw
+    for path, size in ((TRAY_PNG_PATH, None), (ICON_PATH, (64, 64))):
+        if path.exists():
+            try:
+                img = Image.open(str(path))
+                img.load()
+                _tray_image = img.resize(size, Image.LANCZOS) if size else img
+                return _tray_image
+            except:
+                pass
     img = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
     d = ImageDraw.Draw(img)
     d.rectangle([8, 8, 56, 56], outline=(0, 0, 0, 255))
+    _tray_image = img
     return img
 
+class StartupTimer:
+    def __init__(self, t0):
+        self.t0 = t0
+        self.phases = []
+        self._last = t0
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last, now - self.t0))
+        self._last = now
+
+    def report(self):
+        lines = ["startup: phase              |  self [us] | cumulative [us]"]
+        for phase, own, total in self.phases:
+            lines.append(f"startup: {phase:<18} | {int(own * 1e6):>10} | {int(total * 1e6):>15}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        try:
+            Path(path).write_text(self.report(), encoding="utf-8")
+        except:
+            pass
+
 def get_appdata_folder():
     if sys.platform == "win32":
         base = os.getenv("LOCALAPPDATA")
@@ -43,16 +93,108 @@ SETTINGS_FILE = APPDATA_DIR / "settings.json"
 SETTINGS_BAK = APPDATA_DIR / "settings.json.bak"
 LAST_USED_FILE = APPDATA_DIR / "last_used.json"
 LAST_USED_BAK = APPDATA_DIR / "last_used.json.bak"
+SNAPSHOT_FILE = APPDATA_DIR / "snapshot.json"
+SNAPSHOT_BAK = APPDATA_DIR / "snapshot.json.bak"
+JOURNAL_FILE = APPDATA_DIR / "journal.jsonl"
+JOURNAL_OLD = APPDATA_DIR / "journal.jsonl.old"
+HISTORY_DB = APPDATA_DIR / "history.db"
+ROLLUPS_FILE = APPDATA_DIR / "rollups.json"
+ROLLUPS_BAK = APPDATA_DIR / "rollups.json.bak"
+TITLES_FILE = APPDATA_DIR / "titles.bin"
+SEGMENTS_DIR = APPDATA_DIR / "segments"
+COLD_DIR = APPDATA_DIR / "cold"
 ICON_PATH = Path(sys._MEIPASS, "trayicon.ico") if hasattr(sys, "_MEIPASS") else Path("trayicon.ico")
-TRACK_INTERVAL = 1
+TRAY_PNG_PATH = Path(sys._MEIPASS, "trayicon_64.png") if hasattr(sys, "_MEIPASS") else Path("trayicon_64.png")
+STARTUP_LOG = APPDATA_DIR / "startup.log"
+ARCHIVE_FILE = APPDATA_DIR / "archive.json"
+ARCHIVE_BAK = APPDATA_DIR / "archive.json.bak"
+RETENTION_LOG = APPDATA_DIR / "retention.log"
+METRICS_FILE = APPDATA_DIR / "metrics.prom"
+API_TOKEN_FILE = APPDATA_DIR / "api_token"
+POLL_MIN_INTERVAL = 0.25
+POLL_MAX_INTERVAL = 3.0
+POLL_BACKOFF = 2.0
 SAVE_INTERVAL = 5
+JOURNAL_COMPACT_RECORDS = 2000
+HISTORY_BATCH = 64
+HISTORY_MAX_ROW = 3600
+PERSIST_QUEUE_SIZE = 1024
+ROLLUP_LEVELS = ("hour", "day", "week", "month")
+ROLLUP_SPAN = {"hour": 3600, "day": 86400, "week": 604800, "month": 2678400}
+EXPORT_CHUNK = 1000
+EXPORT_MAGIC = b"ASEX"
+EXPORT_VERSION = 1
+FLEET_FANIN = 256
+API_PORT = 47811
+API_MAX_WAIT = 30
+API_HOSTS = ("127.0.0.1", "localhost")
+API_TOKEN_HEADER = "X-AllSeeingEye-Token"
+PERSIST_PUT_TIMEOUT = 0.5
+PROCESS_CACHE_SIZE = 256
+PROCESS_REVALIDATE = 30
+PROCESS_SWEEP_INTERVAL = 60
+PUSH_WAKE_INTERVAL = 5
+METRICS_INTERVAL = 15
+METRICS_PREFIX = "allseeingeye_"
+METRICS_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RETENTION_INTERVAL = 3600
+RETENTION_DELAY = 60
+RETENTION_CHUNK = 500
+SEGMENT_MAGIC = b"ASEG"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = "<4sHHIIdd"
+SEGMENT_ROWS = 65536
+SEGMENT_FLUSH_INTERVAL = 3600
+COLD_HEADER = "<IIqI"
+COLD_BLOCK_SPAN = 86400
+COLD_WORKERS = 4
+TITLES_MAGIC = b"ASET"
+TITLES_VERSION = 1
+TITLES_SAVE_INTERVAL = 300
+TITLE_MAX_LEN = 256
+TITLE_CACHE_SIZE = 4096
+DEFAULT_TITLE_RULES = [
+    [r"^\(\d+\)\s*", ""],
+    [r"^[\u25cf\u2022*]\s*", ""],
+    [r"\s*[-\u2013\u2014]\s*(Google Chrome|Mozilla Firefox|Microsoft\u200b? Edge|Visual Studio Code|Notepad\+\+|Word|Excel)$", ""],
+    [r"^(https?://[^?#\s]+)[?#]\S*$", r"\1"],
+]
+FILTER_CACHE_SIZE = 4096
+CHANGE_LOG_SIZE = 4096
+SHARED_MAGIC = b"ASHM"
+SHARED_VERSION = 1
+SHARED_CONTROL = "<4sHHII"
+SHARED_HEADER = "<QQQQdIIIIIiiii10s"
+SHARED_MIN_ROWS = 1024
+SHARED_READ_RETRIES = 100
+SHARED_ATTACH_TIMEOUT = 15
+SHARED_CHECK_INTERVAL = 5
+APP_TABLE_ROWS = 15
+APP_TABLE_COLUMNS = ("app", "total", "last_used", "today")
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WM_QUIT = 0x0012
+
+def data_path(base: Path, path: Path):
+    return Path(base) / path.name
+
+def file_size(path: Path):
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
 
 def atomic_write_json(path: Path, data, bak_path: Path):
+    t0 = time.perf_counter()
     tmp_path = path.with_suffix(path.suffix + ".tmp")
     with tmp_path.open("w", encoding="utf-8") as f:
         json.dump(data, f)
         f.flush()
+        t1 = time.perf_counter()
         os.fsync(f.fileno())
+        if _metrics is not None:
+            _metrics.observe("json_fsync_seconds", time.perf_counter() - t1)
+            _metrics.inc("json_write_bytes_total", f.tell())
     if path.exists():
         try:
             if bak_path:
@@ -68,6 +210,8 @@ def atomic_write_json(path: Path, data, bak_path: Path):
         except:
             pass
     os.replace(tmp_path, path)
+    if _metrics is not None:
+        _metrics.observe("json_write_seconds", time.perf_counter() - t0)
 
 def load_json_with_backup(path: Path, bak_path: Path):
     def _read(p: Path):
@@ -92,6 +236,1764 @@ def load_json_with_backup(path: Path, bak_path: Path):
         return data
     return {}
 
+class SessionJournal:
+    def __init__(self, path: Path, old_path: Path, seq=0):
+        self.path = path
+        self.old_path = old_path
+        self.seq = seq
+        self.records = 0
+        self.bytes_written = 0
+        self.lock = threading.Lock()
+        self._seq_lock = threading.Lock()
+        self._f = path.open("a", encoding="utf-8")
+
+    def entry(self, app, start, end, is_open=False, base=None):
+        with self._seq_lock:
+            self.seq += 1
+            seq = self.seq
+        rec = {"seq": seq, "app": app, "start": start, "end": end}
+        if is_open:
+            rec["open"] = 1
+        if base is not None:
+            rec["base"] = base
+        return json.dumps(rec, separators=(",", ":")) + "\n"
+
+    def write_many(self, lines):
+        with self.lock:
+            for line in lines:
+                self._f.write(line)
+                self.bytes_written += len(line.encode("utf-8"))
+            self._f.flush()
+            t0 = time.perf_counter()
+            os.fsync(self._f.fileno())
+            self.records += len(lines)
+            if _metrics is not None:
+                _metrics.observe("journal_fsync_seconds", time.perf_counter() - t0)
+
+    def append(self, app, start, end, is_open=False):
+        self.write_many([self.entry(app, start, end, is_open)])
+
+    def rotate(self):
+        with self.lock:
+            if self.old_path.exists():
+                return None
+            self._f.close()
+            try:
+                os.replace(self.path, self.old_path)
+            finally:
+                self._f = self.path.open("a", encoding="utf-8")
+            self.records = 0
+            return self.seq
+
+    def discard_old(self):
+        try:
+            if self.old_path.exists():
+                self.old_path.unlink()
+        except:
+            pass
+
+    def close(self):
+        with self.lock:
+            try:
+                self._f.close()
+            except:
+                pass
+
+def _apply_segment(data, last_used, app, start, end):
+    data[app] = data.get(app, 0) + max(0.0, end - start)
+    if end > last_used.get(app, 0):
+        last_used[app] = end
+
+def rollup_label(level, ts):
+    lt = time.localtime(ts)
+    if level == "hour":
+        return time.strftime("%Y-%m-%dT%H", lt)
+    if level == "day":
+        return time.strftime("%Y-%m-%d", lt)
+    if level == "week":
+        year, week, _ = datetime.date(lt.tm_year, lt.tm_mon, lt.tm_mday).isocalendar()
+        return f"{year}-W{week:02d}"
+    return time.strftime("%Y-%m", lt)
+
+def rollup_start(level, ts):
+    lt = time.localtime(ts)
+    if level == "hour":
+        return ts - (ts + lt.tm_gmtoff) % 3600
+    if level == "day":
+        parts = (lt.tm_year, lt.tm_mon, lt.tm_mday, 0)
+    elif level == "week":
+        parts = (lt.tm_year, lt.tm_mon, lt.tm_mday - lt.tm_wday, 0)
+    else:
+        parts = (lt.tm_year, lt.tm_mon, 1, 0)
+    start = time.mktime(parts + (0, 0, 0, 0, -1))
+    return start if start <= ts else ts - (ts + lt.tm_gmtoff) % 3600
+
+def next_rollup_boundary(level, ts):
+    lt = time.localtime(ts)
+    if level == "hour":
+        return ts + 3600 - (ts + lt.tm_gmtoff) % 3600
+    if level == "day":
+        parts = (lt.tm_year, lt.tm_mon, lt.tm_mday + 1, 0)
+    elif level == "week":
+        parts = (lt.tm_year, lt.tm_mon, lt.tm_mday + 7 - lt.tm_wday, 0)
+    else:
+        parts = (lt.tm_year, lt.tm_mon + 1, 1, 0)
+    boundary = time.mktime(parts + (0, 0, 0, 0, -1))
+    return boundary if boundary > ts else ts + 3600
+
+class Rollups:
+    def __init__(self, buckets=None, seq=0, floor=None):
+        self.buckets = buckets or {level: {} for level in ROLLUP_LEVELS}
+        self.seq = seq
+        self.floor = floor or {}
+        self._owned = None
+
+    def add(self, app, start, end):
+        owned = self._owned
+        t = start
+        while t < end:
+            piece_end = min(end, next_rollup_boundary("hour", t))
+            seconds = piece_end - t
+            for level in ROLLUP_LEVELS:
+                label = rollup_label(level, t)
+                buckets = self.buckets[level]
+                if owned is None:
+                    bucket = buckets.setdefault(label, {})
+                elif label in owned[level]:
+                    bucket = buckets[label]
+                else:
+                    bucket = buckets[label] = dict(buckets.get(label, ()))
+                    owned[level].add(label)
+                bucket[app] = bucket.get(app, 0) + seconds
+            t = piece_end
+
+    def freeze(self):
+        self._owned = {level: set() for level in ROLLUP_LEVELS}
+        return Rollups({level: dict(self.buckets[level]) for level in ROLLUP_LEVELS}, self.seq, dict(self.floor))
+
+    def bucket(self, level, ts=None):
+        return dict(self.buckets[level].get(rollup_label(level, time.time() if ts is None else ts), {}))
+
+    def totals(self, level, start_ts, end_ts):
+        totals = {}
+        floor = self.floor.get(level)
+        if floor and start_ts < floor:
+            totals = self.totals("day", start_ts, min(end_ts, floor))
+            start_ts = floor
+        buckets = self.buckets[level]
+        if end_ts <= start_ts:
+            return totals
+        lo = rollup_label(level, start_ts)
+        hi = rollup_label(level, end_ts - 0.001)
+        if (end_ts - start_ts) / ROLLUP_SPAN[level] <= len(buckets):
+            selected = []
+            t = start_ts
+            while t < end_ts:
+                label = rollup_label(level, t)
+                if label in buckets:
+                    selected.append((label, buckets[label]))
+                t = next_rollup_boundary(level, t)
+        else:
+            selected = [(label, bucket) for label, bucket in buckets.items() if lo <= label <= hi]
+        def share(t):
+            first, last = rollup_start(level, t), next_rollup_boundary(level, t)
+            return (min(last, end_ts) - max(first, start_ts)) / (last - first)
+        scale = {lo: share(start_ts), hi: share(end_ts - 0.001)}
+        for label, bucket in selected:
+            f = scale.get(label, 1.0)
+            for app, seconds in bucket.items():
+                totals[app] = totals.get(app, 0) + seconds * f
+        return totals
+
+    def prune(self, level, before_ts, limit=RETENTION_CHUNK):
+        import itertools
+        cutoff = rollup_label(level, before_ts)
+        buckets = self.buckets[level]
+        old = list(itertools.islice((label for label in buckets if label < cutoff), limit))
+        for label in old:
+            del buckets[label]
+        if before_ts > self.floor.get(level, 0):
+            self.floor[level] = before_ts
+        return len(old)
+
+    def to_json(self, seq=None):
+        names = {}
+        out = {"seq": self.seq if seq is None else seq, "floor": self.floor}
+        for level in ROLLUP_LEVELS:
+            out[level] = {
+                label: [[names.setdefault(app, len(names)), round(seconds, 3)] for app, seconds in bucket.items()]
+                for label, bucket in self.buckets[level].items()
+            }
+        out["apps"] = list(names)
+        return out
+
+    @classmethod
+    def from_json(cls, obj):
+        if not obj:
+            return cls()
+        apps = obj.get("apps", [])
+        buckets = {}
+        for level in ROLLUP_LEVELS:
+            buckets[level] = {
+                label: {apps[i]: seconds for i, seconds in pairs}
+                for label, pairs in obj.get(level, {}).items()
+            }
+        return cls(buckets, obj.get("seq", 0), obj.get("floor"))
+
+def replay_journal(paths, data, last_used, after_seq=0, rollups=None, intervals=None):
+    max_seq = after_seq
+    replayed = 0
+    pending = None
+    min_seq = after_seq if rollups is None else min(after_seq, rollups.seq)
+    def apply(seq, app, start, end, base=None):
+        if intervals is not None:
+            intervals.append((app, start, end))
+        if seq > after_seq:
+            if base is not None and app not in data:
+                data[app] = base
+            _apply_segment(data, last_used, app, start, end)
+        if rollups is not None and seq > rollups.seq:
+            rollups.add(app, start, end)
+    for p in paths:
+        try:
+            if not p.exists():
+                continue
+            lines = p.read_text(encoding="utf-8").splitlines()
+        except:
+            continue
+        for line in lines:
+            try:
+                rec = json.loads(line)
+                seq = int(rec["seq"])
+                app = rec["app"]
+                start = float(rec["start"])
+                end = float(rec["end"])
+            except:
+                continue
+            if seq <= min_seq:
+                continue
+            max_seq = max(max_seq, seq)
+            replayed += 1
+            base = rec.get("base")
+            if rec.get("open"):
+                pending = (seq, app, start, end, base)
+                continue
+            if pending and pending[1] == app and pending[2] == start:
+                pending = None
+            apply(seq, app, start, end, base)
+    if pending:
+        apply(*pending)
+    if rollups is not None:
+        rollups.seq = max(rollups.seq, max_seq)
+    return max_seq, replayed
+
+def write_snapshot(data, last_used, seq, base=APPDATA_DIR, rollups=None):
+    snapshot = {"seq": seq, "data": data, "last_used": last_used}
+    atomic_write_json(data_path(base, SNAPSHOT_FILE), snapshot, data_path(base, SNAPSHOT_BAK))
+    atomic_write_json(data_path(base, DATA_FILE), data, data_path(base, DATA_BAK))
+    atomic_write_json(data_path(base, LAST_USED_FILE), last_used, data_path(base, LAST_USED_BAK))
+    if rollups is not None:
+        atomic_write_json(data_path(base, ROLLUPS_FILE), rollups, data_path(base, ROLLUPS_BAK))
+
+def load_state_with_journal(base=APPDATA_DIR, compact=True, intervals=None):
+    snap = load_json_with_backup(data_path(base, SNAPSHOT_FILE), data_path(base, SNAPSHOT_BAK))
+    if snap:
+        data = snap.get("data", {})
+        last_used = snap.get("last_used", {})
+        seq = snap.get("seq", 0)
+    else:
+        data = load_json_with_backup(data_path(base, DATA_FILE), data_path(base, DATA_BAK))
+        last_used = load_json_with_backup(data_path(base, LAST_USED_FILE), data_path(base, LAST_USED_BAK))
+        seq = 0
+    rollups = Rollups.from_json(load_json_with_backup(data_path(base, ROLLUPS_FILE), data_path(base, ROLLUPS_BAK)))
+    journals = [data_path(base, JOURNAL_OLD), data_path(base, JOURNAL_FILE)]
+    seq, replayed = replay_journal(journals, data, last_used, seq, rollups, intervals)
+    if compact and (replayed or not snap):
+        try:
+            write_snapshot(data, last_used, seq, base, rollups.to_json(seq))
+            for p in journals:
+                if p.exists():
+                    p.unlink()
+        except:
+            pass
+    return data, last_used, rollups, seq
+
+class TitleNormalizer:
+    def __init__(self, rules=None):
+        self.rules = []
+        self.errors = []
+        for pattern, repl in DEFAULT_TITLE_RULES if rules is None else rules:
+            try:
+                self.rules.append((re.compile(pattern), repl))
+            except re.error as e:
+                self.errors.append(f"{pattern}: {e}")
+        self._cache = {}
+
+    def normalize(self, title):
+        if not title:
+            return None
+        result = self._cache.get(title)
+        if result is None:
+            result = title
+            for pattern, repl in self.rules:
+                result = pattern.sub(repl, result)
+            result = " ".join(result.replace("\0", "").split())[:TITLE_MAX_LEN]
+            if len(self._cache) >= TITLE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[title] = result
+        return result or None
+
+class SymbolTable:
+    def __init__(self):
+        self._blob = bytearray()
+        self._offsets = array("I", [0])
+        self._hashes = array("q")
+        self._slots = array("i", [-1]) * 1024
+        self._mask = 1023
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __getitem__(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def _grow(self):
+        size = len(self._slots) * 2
+        self._slots = array("i", [-1]) * size
+        self._mask = size - 1
+        for i, h in enumerate(self._hashes):
+            j = h & self._mask
+            while self._slots[j] != -1:
+                j = (j + 1) & self._mask
+            self._slots[j] = i
+
+    def get(self, value):
+        h = hash(value)
+        mask = self._mask
+        i = h & mask
+        slots = self._slots
+        while slots[i] != -1:
+            sid = slots[i]
+            if self._hashes[sid] == h and self[sid] == value:
+                return sid
+            i = (i + 1) & mask
+        return None
+
+    def intern(self, value):
+        sid = self.get(value)
+        if sid is not None:
+            return sid
+        h = hash(value)
+        sid = len(self._hashes)
+        self._blob += value.encode("utf-8")
+        self._offsets.append(len(self._blob))
+        self._hashes.append(h)
+        i = h & self._mask
+        while self._slots[i] != -1:
+            i = (i + 1) & self._mask
+        self._slots[i] = sid
+        if len(self._hashes) * 2 > len(self._slots):
+            self._grow()
+        return sid
+
+    def nbytes(self):
+        return len(self._blob) + sum(a.itemsize * len(a) for a in (self._offsets, self._hashes, self._slots))
+
+class TitleStore:
+    def __init__(self):
+        self.symbols = SymbolTable()
+        self._row_of = array("i")
+        self._shared = {}
+        self._by_app = {}
+        self.apps = array("I")
+        self.titles = array("I")
+        self.seconds = array("d")
+        self.last_used = array("d")
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.seconds)
+
+    def intern(self, value):
+        sid = self.symbols.intern(value)
+        while len(self._row_of) <= sid:
+            self._row_of.append(-1)
+        return sid
+
+    def _row(self, app_id, title_id):
+        row = self._row_of[title_id]
+        if row >= 0 and self.apps[row] == app_id:
+            return row
+        if row >= 0:
+            key = app_id << 32 | title_id
+            row = self._shared.get(key)
+            if row is not None:
+                return row
+            row = self._shared[key] = len(self.seconds)
+        else:
+            row = self._row_of[title_id] = len(self.seconds)
+        self.apps.append(app_id)
+        self.titles.append(title_id)
+        self.seconds.append(0.0)
+        self.last_used.append(0.0)
+        self._index(app_id, row)
+        return row
+
+    def _index(self, app_id, row):
+        rows = self._by_app.get(app_id)
+        if rows is None:
+            rows = self._by_app[app_id] = array("I")
+        rows.append(row)
+
+    def add(self, app, title, start, end):
+        if end <= start:
+            return
+        row = self._row(self.intern(app), self.intern(title))
+        self.seconds[row] += end - start
+        if end > self.last_used[row]:
+            self.last_used[row] = end
+        self.dirty = True
+
+    def rows(self, app=None):
+        if app is None:
+            return range(len(self.seconds))
+        app_id = self.symbols.get(app)
+        if app_id is None:
+            return []
+        return self._by_app.get(app_id, ())
+
+    def top(self, app=None, n=10):
+        return self.describe(self.rank(self.rows(app), n))
+
+    def rank(self, rows, n=10):
+        import heapq
+        return heapq.nlargest(n, rows, key=self.seconds.__getitem__)
+
+    def describe(self, rows):
+        return [(self.symbols[self.apps[r]], self.symbols[self.titles[r]], self.seconds[r], self.last_used[r]) for r in rows]
+
+    def nbytes(self):
+        columns = (self._row_of, self.apps, self.titles, self.seconds, self.last_used, *self._by_app.values())
+        return self.symbols.nbytes() + sum(col.itemsize * len(col) for col in columns)
+
+    def sizes(self):
+        return len(self.symbols), len(self.symbols._blob), len(self.seconds)
+
+    def to_bytes(self, sizes=None):
+        symbols = self.symbols
+        n_symbols, symbols_len, n_rows = self.sizes() if sizes is None else sizes
+        parts = [TITLES_MAGIC, struct.pack("<HIII", TITLES_VERSION, n_symbols, symbols_len, n_rows)]
+        parts.append(symbols._offsets.tobytes()[:symbols._offsets.itemsize * (n_symbols + 1)])
+        parts.append(bytes(symbols._blob[:symbols_len]))
+        for col in (self.apps, self.titles, self.seconds, self.last_used):
+            parts.append(col.tobytes()[:col.itemsize * n_rows])
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        store = cls()
+        if blob[:len(TITLES_MAGIC)] != TITLES_MAGIC:
+            raise ValueError("not an AllSeeingEye titles file")
+        offset = len(TITLES_MAGIC)
+        _, n_symbols, symbols_len, n_rows = struct.unpack_from("<HIII", blob, offset)
+        offset += struct.calcsize("<HIII")
+        offsets = array("I")
+        offsets.frombytes(blob[offset:offset + offsets.itemsize * (n_symbols + 1)])
+        offset += offsets.itemsize * (n_symbols + 1)
+        text = blob[offset:offset + symbols_len]
+        offset += symbols_len
+        for i in range(n_symbols):
+            store.intern(text[offsets[i]:offsets[i + 1]].decode("utf-8"))
+        for col in (store.apps, store.titles, store.seconds, store.last_used):
+            size = col.itemsize * n_rows
+            col.frombytes(blob[offset:offset + size])
+            offset += size
+        for row, (app, title) in enumerate(zip(store.apps, store.titles)):
+            store._index(app, row)
+            if store._row_of[title] < 0:
+                store._row_of[title] = row
+            else:
+                store._shared[app << 32 | title] = row
+        return store
+
+    @classmethod
+    def load(cls, path):
+        try:
+            return cls.from_bytes(path.read_bytes())
+        except:
+            return cls()
+
+    def save(self, path, blob=None):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(self.to_bytes() if blob is None else blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+class HistoryStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS apps (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            last_used REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS segments (
+            app_id INTEGER NOT NULL,
+            start_ts REAL NOT NULL,
+            end_ts REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_segments_app_start ON segments(app_id, start_ts);
+        CREATE INDEX IF NOT EXISTS idx_segments_start ON segments(start_ts);
+        CREATE INDEX IF NOT EXISTS idx_apps_total ON apps(total);
+        CREATE INDEX IF NOT EXISTS idx_apps_last_used ON apps(last_used);
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._app_ids = {}
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        for app_id, name in conn.execute("SELECT id, name FROM apps"):
+            self._app_ids[name] = app_id
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(str(self.path), timeout=10)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _app_id(self, conn, app):
+        app_id = self._app_ids.get(app)
+        if app_id is None:
+            conn.execute("INSERT OR IGNORE INTO apps(name) VALUES (?)", (app,))
+            app_id = conn.execute("SELECT id FROM apps WHERE name = ?", (app,)).fetchone()[0]
+            self._app_ids[app] = app_id
+        return app_id
+
+    def seed_totals(self, data, last_used):
+        if self._app_ids:
+            return False
+        conn = self._conn()
+        with conn:
+            for app, seconds in data.items():
+                app_id = self._app_id(conn, app)
+                conn.execute("UPDATE apps SET total = ?, last_used = ? WHERE id = ?", (seconds, last_used.get(app, 0), app_id))
+        return True
+
+    def last_end(self):
+        row = self._conn().execute(
+            "SELECT MAX(end_ts) FROM segments WHERE start_ts >= (SELECT MAX(start_ts) FROM segments) - ?",
+            (HISTORY_MAX_ROW,),
+        ).fetchone()
+        return row[0]
+
+    def add_segment(self, app, start, end):
+        with self._pending_lock:
+            self._pending.append((app, start, end))
+            return len(self._pending) >= HISTORY_BATCH
+
+    def flush(self):
+        import sqlite3
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        conn = self._conn()
+        try:
+            with conn:
+                rows = []
+                for app, start, end in batch:
+                    app_id = self._app_id(conn, app)
+                    t = start
+                    while t < end:
+                        e = min(end, t + HISTORY_MAX_ROW)
+                        rows.append((app_id, t, e))
+                        t = e
+                    conn.execute("UPDATE apps SET total = total + ?, last_used = MAX(last_used, ?) WHERE id = ?", (max(0.0, end - start), end, app_id))
+                conn.executemany("INSERT INTO segments(app_id, start_ts, end_ts) VALUES (?, ?, ?)", rows)
+        except sqlite3.Error:
+            self._app_ids.clear()
+            with self._pending_lock:
+                self._pending = batch + self._pending
+
+    def top_apps(self, start, end, n=10):
+        return self._conn().execute(
+            "SELECT a.name, SUM(MIN(s.end_ts, ?) - MAX(s.start_ts, ?)) AS secs"
+            " FROM segments s JOIN apps a ON a.id = s.app_id"
+            " WHERE s.start_ts >= ? AND s.start_ts < ? AND s.end_ts > ?"
+            " GROUP BY s.app_id ORDER BY secs DESC LIMIT ?",
+            (end, start, start - HISTORY_MAX_ROW, end, start, n),
+        ).fetchall()
+
+    def app_time(self, app, start, end):
+        app_id = self._app_ids.get(app)
+        if app_id is None:
+            return 0.0
+        row = self._conn().execute(
+            "SELECT SUM(MIN(end_ts, ?) - MAX(start_ts, ?)) FROM segments"
+            " WHERE app_id = ? AND start_ts >= ? AND start_ts < ? AND end_ts > ?",
+            (end, start, app_id, start - HISTORY_MAX_ROW, end, start),
+        ).fetchone()
+        return row[0] or 0.0
+
+    def segments(self, start, end):
+        return self._conn().execute(
+            "SELECT a.name, s.start_ts, s.end_ts FROM segments s JOIN apps a ON a.id = s.app_id"
+            " WHERE s.start_ts >= ? AND s.start_ts < ? AND s.end_ts > ? ORDER BY s.start_ts",
+            (start - HISTORY_MAX_ROW, end, start),
+        )
+
+    def drop_before(self, cutoff, batch=5000):
+        self.flush()
+        conn = self._conn()
+        size = lambda: conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+        before = size()
+        deleted = 0
+        while True:
+            with conn:
+                n = conn.execute(
+                    "DELETE FROM segments WHERE rowid IN (SELECT rowid FROM segments WHERE end_ts <= ? LIMIT ?)",
+                    (cutoff, batch),
+                ).rowcount
+            deleted += n
+            if n < batch:
+                break
+        if deleted:
+            conn.executescript("PRAGMA incremental_vacuum;")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted, before - size()
+
+    def totals(self, order_by="total", limit=-1):
+        column = "last_used" if order_by == "last_used" else "total"
+        return self._conn().execute(
+            f"SELECT name, total, last_used FROM apps ORDER BY {column} DESC LIMIT ?", (limit,)
+        )
+
+    def close(self):
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+class SegmentReader:
+    def __init__(self, path: Path):
+        import mmap
+        self.path = path
+        with path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, _, n, n_apps, self.min_start, self.max_end = struct.unpack_from(SEGMENT_HEADER, self._mm, 0)
+        if magic != SEGMENT_MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not an AllSeeingEye segment")
+        self.rows = n
+        self._views = []
+        offset = struct.calcsize(SEGMENT_HEADER)
+        self.starts, offset = self._column(offset, "d", n)
+        self.durations, offset = self._column(offset, "d", n)
+        self.apps, offset = self._column(offset, "I", n)
+        offset += -offset % 8
+        self.app_totals, offset = self._column(offset, "d", n_apps)
+        self._name_offsets, offset = self._column(offset, "I", n_apps + 1)
+        self._names_at = offset
+        self._names = None
+        self.users = 0
+        self.retired = False
+        self.doomed = False
+
+    def _column(self, offset, typecode, n):
+        raw = memoryview(self._mm)[offset:offset + n * struct.calcsize(typecode)]
+        view = raw.cast(typecode)
+        self._views += [view, raw]
+        return view, offset + len(raw)
+
+    def names(self):
+        if self._names is None:
+            base = self._names_at
+            offsets = self._name_offsets
+            self._names = [self._mm[base + offsets[i]:base + offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        return self._names
+
+    def totals(self, start=None, end=None, into=None):
+        import bisect
+        into = {} if into is None else into
+        if not self.rows or (start is not None and self.max_end <= start) or (end is not None and self.min_start >= end):
+            return into
+        if (start is None or start <= self.min_start) and (end is None or self.max_end <= end):
+            acc = self.app_totals
+        else:
+            starts, durations, apps = self.starts, self.durations, self.apps
+            start = self.min_start if start is None else start
+            end = self.max_end if end is None else end
+            acc = [0.0] * len(self.app_totals)
+            lo = bisect.bisect_left(starts, start - HISTORY_MAX_ROW)
+            inner = bisect.bisect_left(starts, start)
+            mid = max(inner, bisect.bisect_left(starts, end - HISTORY_MAX_ROW))
+            hi = bisect.bisect_left(starts, end)
+            for i in range(lo, inner):
+                overlap = min(starts[i] + durations[i], end) - start
+                if overlap > 0:
+                    acc[apps[i]] += overlap
+            for a, d in zip(apps[inner:mid], durations[inner:mid]):
+                acc[a] += d
+            for i in range(mid, hi):
+                acc[apps[i]] += min(durations[i], end - starts[i])
+        names = self.names()
+        for i, seconds in enumerate(acc):
+            if seconds:
+                into[names[i]] = into.get(names[i], 0.0) + seconds
+        return into
+
+    def intervals(self):
+        names = self.names()
+        starts, durations, apps = self.starts, self.durations, self.apps
+        return [(names[apps[i]], starts[i], starts[i] + durations[i]) for i in range(self.rows)]
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mm.close()
+
+def segment_span(path: Path):
+    try:
+        parts = [int(p) for p in path.stem[4:].split("-")]
+    except ValueError:
+        return None
+    return parts[0], parts[-1]
+
+def write_segment(path: Path, rows):
+    rows.sort(key=lambda r: r[1])
+    ids = {}
+    for app, _, _ in rows:
+        ids.setdefault(app, len(ids))
+    starts = array("d", (r[1] for r in rows))
+    durations = array("d", (r[2] - r[1] for r in rows))
+    apps = array("I", (ids[r[0]] for r in rows))
+    totals = array("d", [0.0]) * len(ids)
+    for app_id, duration in zip(apps, durations):
+        totals[app_id] += duration
+    names = [app.encode("utf-8") for app in ids]
+    offsets = array("I", [0])
+    for name in names:
+        offsets.append(offsets[-1] + len(name))
+    header = struct.pack(SEGMENT_HEADER, SEGMENT_MAGIC, SEGMENT_VERSION, 0, len(rows), len(ids), starts[0], max(r[2] for r in rows))
+    body = [header, starts.tobytes(), durations.tobytes(), apps.tobytes()]
+    body.append(b"\0" * (-(len(header) + 20 * len(rows)) % 8))
+    body += [totals.tobytes(), offsets.tobytes(), b"".join(names)]
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(b"".join(body))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class SegmentStore:
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._readers = {}
+        self._doomed = set()
+        spans = [segment_span(p) for p in self.path.glob("seg-*.ase")]
+        self._next = max((span[1] for span in spans if span), default=0) + 1
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def add(self, app, start, end):
+        with self._lock:
+            t = start
+            while t < end:
+                e = min(end, t + HISTORY_MAX_ROW)
+                self._pending.append((app, t, e))
+                t = e
+            return len(self._pending) >= SEGMENT_ROWS
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            number = self._next
+            if rows:
+                self._next += 1
+        if not rows:
+            return None
+        path = self.path / f"seg-{number:06d}.ase"
+        try:
+            write_segment(path, rows)
+        except OSError:
+            with self._lock:
+                self._pending = rows + self._pending
+            return None
+        return path
+
+    def files(self):
+        spans = sorted(
+            ((span, p) for p in self.path.glob("seg-*.ase") for span in [segment_span(p)] if span and p not in self._doomed),
+            key=lambda item: (item[0][0], -item[0][1]),
+        )
+        files = []
+        covered = 0
+        for (first, last), path in spans:
+            if last > covered:
+                files.append(path)
+                covered = last
+        return files
+
+    def _retire(self, path, doomed=False):
+        reader = self._readers.pop(path, None)
+        if reader is None:
+            return False
+        if not reader.users:
+            reader.close()
+            return False
+        reader.retired = True
+        if doomed:
+            reader.doomed = True
+            self._doomed.add(path)
+        return True
+
+    def _close(self, reader):
+        reader.close()
+        if reader.doomed:
+            try:
+                reader.path.unlink()
+            except OSError:
+                pass
+            self._doomed.discard(reader.path)
+
+    def _release(self, path):
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return 0
+        with self._lock:
+            deferred = self._retire(path, doomed=True)
+        if not deferred:
+            try:
+                path.unlink()
+            except OSError:
+                return 0
+        return size
+
+    def compact(self):
+        live = self.files()
+        reclaimed = sum(self._release(p) for p in set(self.path.glob("seg-*.ase")) - set(live) - self._doomed)
+        held = self.readers()
+        try:
+            readers = {reader.path: reader for reader in held}
+            groups = [[]]
+            rows = 0
+            for path in live:
+                reader = readers.get(path)
+                if reader is None or reader.rows >= SEGMENT_ROWS or rows + reader.rows > SEGMENT_ROWS:
+                    groups.append([])
+                    rows = 0
+                if reader is not None and reader.rows < SEGMENT_ROWS:
+                    groups[-1].append(reader)
+                    rows += reader.rows
+            merged = 0
+            for group in groups:
+                if len(group) < 2:
+                    continue
+                intervals = []
+                for reader in group:
+                    intervals += reader.intervals()
+                first, last = segment_span(group[0].path)[0], segment_span(group[-1].path)[1]
+                target = self.path / f"seg-{first:06d}-{last:06d}.ase"
+                write_segment(target, intervals)
+                reclaimed += sum(self._release(reader.path) for reader in group) - target.stat().st_size
+                merged += len(group)
+        finally:
+            self.release(held)
+        return merged, reclaimed
+
+    def readers(self):
+        with self._lock:
+            live = self.files()
+            for path in live:
+                if path not in self._readers:
+                    try:
+                        self._readers[path] = SegmentReader(path)
+                    except (OSError, ValueError, struct.error):
+                        continue
+            readers = [self._readers[path] for path in live if path in self._readers]
+            for reader in readers:
+                reader.users += 1
+            return readers
+
+    def last_end(self):
+        readers = self.readers()
+        try:
+            return max((reader.max_end for reader in readers if reader.rows), default=None)
+        finally:
+            self.release(readers)
+
+    def release(self, readers):
+        with self._lock:
+            for reader in readers:
+                reader.users -= 1
+                if reader.retired and not reader.users:
+                    self._close(reader)
+
+    def totals(self, start=None, end=None):
+        result = {}
+        readers = self.readers()
+        try:
+            for reader in readers:
+                reader.totals(start, end, result)
+        finally:
+            self.release(readers)
+        with self._lock:
+            pending = list(self._pending)
+        for app, s, e in pending:
+            if start is not None:
+                s = max(s, start)
+            if end is not None:
+                e = min(e, end)
+            if e > s:
+                result[app] = result.get(app, 0.0) + (e - s)
+        return result
+
+    def intervals(self):
+        readers = self.readers()
+        try:
+            for reader in readers:
+                yield from reader.intervals()
+        finally:
+            self.release(readers)
+        with self._lock:
+            pending = list(self._pending)
+        yield from pending
+
+    def drop_before(self, cutoff, exact=False):
+        dropped = reclaimed = 0
+        readers = self.readers()
+        try:
+            while readers:
+                reader = readers.pop()
+                path, rows = reader.path, reader.rows
+                if reader.min_start >= cutoff:
+                    self.release([reader])
+                    continue
+                expired = reader.max_end <= cutoff
+                kept = [] if expired else [row for row in reader.intervals() if row[2] > cutoff]
+                self.release([reader])
+                if expired:
+                    dropped += 1
+                    reclaimed += self._release(path)
+                    continue
+                if not exact and len(kept) * 4 > rows * 3:
+                    continue
+                size = path.stat().st_size
+                fresh = path.with_suffix(".new")
+                write_segment(fresh, kept)
+                with self._lock:
+                    self._retire(path)
+                    os.replace(fresh, path)
+                reclaimed += size - path.stat().st_size
+        finally:
+            self.release(readers)
+        return dropped, reclaimed
+
+    def close(self):
+        with self._lock:
+            for reader in self._readers.values():
+                if reader.users:
+                    reader.retired = True
+                else:
+                    reader.close()
+            self._readers.clear()
+
+class IntervalIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self._reset()
+
+    def _reset(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.apps = array("I")
+        self.names = []
+        self._ids = {}
+        self._positions = []
+        self._prefix = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _append(self, app, start, end):
+        app_id = self._ids.get(app)
+        if app_id is None:
+            app_id = self._ids[app] = len(self.names)
+            self.names.append(app)
+            self._positions.append(array("I"))
+            self._prefix.append(array("d", [0.0]))
+        prefix = self._prefix[app_id]
+        self._positions[app_id].append(len(self.starts))
+        prefix.append(prefix[-1] + (end - start))
+        self.starts.append(start)
+        self.ends.append(end)
+        self.apps.append(app_id)
+
+    def _rebuild(self, rows):
+        rows.sort(key=lambda r: r[1])
+        self._reset()
+        for app, start, end in rows:
+            self._append(app, start, end)
+
+    def _rows(self, lo=0, hi=None):
+        names = self.names
+        hi = len(self.starts) if hi is None else hi
+        return [(names[self.apps[i]], self.starts[i], self.ends[i]) for i in range(lo, hi)]
+
+    def add(self, app, start, end):
+        if end <= start:
+            return
+        with self._lock:
+            if self.starts and start < self.starts[-1]:
+                self._rebuild(self._rows() + [(app, start, end)])
+            else:
+                self._append(app, start, end)
+
+    def seed(self, rows):
+        fresh = IntervalIndex()
+        ordered = True
+        for app, start, end in rows:
+            if end <= start:
+                continue
+            if fresh.starts and start < fresh.starts[-1]:
+                ordered = False
+            fresh._append(app, start, end)
+        if not ordered:
+            fresh._rebuild(fresh._rows())
+        horizon = fresh.ends[-1] if fresh.ends else float("-inf")
+        with self._lock:
+            for app, start, end in self._rows():
+                if start >= horizon:
+                    fresh._append(app, start, end)
+            self.starts, self.ends, self.apps = fresh.starts, fresh.ends, fresh.apps
+            self.names, self._ids, self._positions, self._prefix = fresh.names, fresh._ids, fresh._positions, fresh._prefix
+            self.loaded = True
+
+    def drop_before(self, cutoff, floor=None):
+        import bisect
+        with self._lock:
+            lo = bisect.bisect_right(self.ends, cutoff)
+            if floor is not None and lo < len(self.starts) and self.starts[lo] < floor:
+                self._rebuild([(app, max(start, floor), end) for app, start, end in self._rows(lo)])
+            elif lo:
+                self._rebuild(self._rows(lo))
+            return lo
+
+    def _span(self, start, end):
+        import bisect
+        lo = 0 if start is None else bisect.bisect_right(self.ends, start)
+        hi = len(self.starts) if end is None else bisect.bisect_left(self.starts, end)
+        return lo, max(lo, hi)
+
+    def app_at(self, ts):
+        import bisect
+        with self._lock:
+            i = bisect.bisect_right(self.starts, ts) - 1
+            if i >= 0 and self.ends[i] > ts:
+                return self.names[self.apps[i]], self.starts[i], self.ends[i]
+            return None
+
+    def overlapping(self, start=None, end=None, limit=None):
+        with self._lock:
+            lo, hi = self._span(start, end)
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return self._rows(lo, hi)
+
+    def _app_time(self, app_id, lo, hi, start, end):
+        import bisect
+        positions = self._positions[app_id]
+        pl = bisect.bisect_left(positions, lo)
+        ph = bisect.bisect_left(positions, hi)
+        if pl >= ph:
+            return 0.0
+        prefix = self._prefix[app_id]
+        seconds = prefix[ph] - prefix[pl]
+        if start is not None:
+            seconds -= max(0.0, start - self.starts[positions[pl]])
+        if end is not None:
+            seconds -= max(0.0, self.ends[positions[ph - 1]] - end)
+        return seconds
+
+    def app_time(self, app, start=None, end=None):
+        with self._lock:
+            app_id = self._ids.get(app)
+            if app_id is None:
+                return 0.0
+            lo, hi = self._span(start, end)
+            return self._app_time(app_id, lo, hi, start, end)
+
+    def totals(self, start=None, end=None):
+        with self._lock:
+            lo, hi = self._span(start, end)
+            totals = {}
+            if hi - lo > 4 * len(self.names):
+                for app_id, app in enumerate(self.names):
+                    seconds = self._app_time(app_id, lo, hi, start, end)
+                    if seconds > 0:
+                        totals[app] = seconds
+                return totals
+            names, starts, ends, apps = self.names, self.starts, self.ends, self.apps
+            for i in range(lo, hi):
+                s = starts[i] if start is None else max(starts[i], start)
+                e = ends[i] if end is None else min(ends[i], end)
+                if e > s:
+                    app = names[apps[i]]
+                    totals[app] = totals.get(app, 0.0) + (e - s)
+            return totals
+
+def encode_cold_block(rows):
+    rows.sort(key=lambda r: r[1])
+    ids = {}
+    for app, _, _ in rows:
+        ids.setdefault(app, len(ids))
+    base = prev = round(rows[0][1] * 1000)
+    deltas = array("I")
+    durations = array("I")
+    for _, start, end in rows:
+        start_ms = round(start * 1000)
+        deltas.append(start_ms - prev)
+        durations.append(max(0, round(end * 1000) - start_ms))
+        prev = start_ms
+    apps = array("I", (ids[r[0]] for r in rows))
+    names = "\0".join(ids).encode("utf-8")
+    header = struct.pack(COLD_HEADER, len(rows), len(ids), base, len(names))
+    return header + names + deltas.tobytes() + durations.tobytes() + apps.tobytes()
+
+def decode_cold_block(payload):
+    import itertools
+    n, _, base, names_len = struct.unpack_from(COLD_HEADER, payload, 0)
+    offset = struct.calcsize(COLD_HEADER)
+    names = payload[offset:offset + names_len].decode("utf-8").split("\0")
+    offset += names_len
+    columns = []
+    for _ in range(3):
+        col = array("I")
+        col.frombytes(payload[offset:offset + 4 * n])
+        columns.append(col)
+        offset += 4 * n
+    deltas, durations, apps = columns
+    starts = itertools.accumulate(deltas, initial=base)
+    next(starts)
+    return [(names[a], s / 1000, (s + d) / 1000) for s, d, a in zip(starts, durations, apps)]
+
+COLD_CODECS = {
+    "zlib": (lambda b: __import__("zlib").compress(b, 9), lambda b: __import__("zlib").decompress(b)),
+    "lzma": (lambda b: __import__("lzma").compress(b, preset=6), lambda b: __import__("lzma").decompress(b)),
+}
+
+class ColdStore:
+    def __init__(self, path: Path, codec="lzma"):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        if codec not in COLD_CODECS:
+            raise ValueError(f"unknown cold codec: {codec}")
+        self.codec = codec
+        self._lock = threading.Lock()
+        index = load_json_with_backup(self.path / "index.json", self.path / "index.json.bak")
+        self.sealed_until = index.get("sealed_until", 0)
+        self._set_blocks(index.get("blocks", []))
+
+    def _set_blocks(self, blocks):
+        blocks.sort(key=lambda b: b["start"])
+        self.blocks = blocks
+        self._starts = [b["start"] for b in blocks]
+        self._reach = []
+        reach = float("-inf")
+        for b in blocks:
+            reach = max(reach, b["end"])
+            self._reach.append(reach)
+
+    def _write_index(self):
+        atomic_write_json(self.path / "index.json", {"sealed_until": self.sealed_until, "blocks": self.blocks}, self.path / "index.json.bak")
+
+    def _pool_map(self, fn, items):
+        if len(items) < 2:
+            return list(map(fn, items))
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(COLD_WORKERS, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+    def seal(self, rows, cutoff):
+        compress = COLD_CODECS[self.codec][0]
+        windows = {}
+        for row in rows:
+            if row[2] > self.sealed_until and row[2] <= cutoff and row[2] > row[1]:
+                windows.setdefault(int(row[1] // COLD_BLOCK_SPAN), []).append(row)
+        groups = [windows[w] for w in sorted(windows)]
+        blobs = self._pool_map(lambda group: compress(encode_cold_block(group)), groups)
+        new_blocks = []
+        written = 0
+        files = {}
+        try:
+            for group, blob in zip(groups, blobs):
+                name = time.strftime("pack-%Y%m.bin", time.gmtime(group[0][1]))
+                f = files.get(name)
+                if f is None:
+                    f = files[name] = (self.path / name).open("ab")
+                apps = {}
+                for app, start, end in group:
+                    apps[app] = apps.get(app, 0.0) + (end - start)
+                new_blocks.append({
+                    "file": name, "offset": f.tell(), "length": len(blob), "codec": self.codec,
+                    "start": group[0][1], "end": max(r[2] for r in group), "rows": len(group), "apps": apps,
+                })
+                f.write(blob)
+                written += len(blob)
+            for f in files.values():
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f in files.values():
+                f.close()
+        with self._lock:
+            self.sealed_until = max(self.sealed_until, cutoff)
+            self._set_blocks(self.blocks + new_blocks)
+            self._write_index()
+        return len(new_blocks), sum(len(g) for g in groups), written
+
+    def _read(self, block):
+        with (self.path / block["file"]).open("rb") as f:
+            f.seek(block["offset"])
+            blob = f.read(block["length"])
+        return decode_cold_block(COLD_CODECS[block["codec"]][1](blob))
+
+    def _touched(self, start, end):
+        import bisect
+        with self._lock:
+            lo = 0 if start is None else bisect.bisect_right(self._reach, start)
+            hi = len(self.blocks) if end is None else bisect.bisect_left(self._starts, end)
+            return [b for b in self.blocks[lo:hi] if start is None or b["end"] > start]
+
+    def totals(self, start=None, end=None, into=None):
+        into = {} if into is None else into
+        partial = []
+        for block in self._touched(start, end):
+            if (start is None or start <= block["start"]) and (end is None or block["end"] <= end):
+                for app, seconds in block["apps"].items():
+                    into[app] = into.get(app, 0.0) + seconds
+            else:
+                partial.append(block)
+        for rows in self._pool_map(self._read, partial):
+            for app, s, e in rows:
+                if start is not None:
+                    s = max(s, start)
+                if end is not None:
+                    e = min(e, end)
+                if e > s:
+                    into[app] = into.get(app, 0.0) + (e - s)
+        return into
+
+    def intervals(self, start=None, end=None):
+        import heapq
+        blocks = self._touched(start, end)
+        heap = []
+        i = 0
+        while i < len(blocks) or heap:
+            while i < len(blocks) and (not heap or blocks[i]["start"] <= heap[0][0]):
+                for app, s, e in self._read(blocks[i]):
+                    if (start is None or e > start) and (end is None or s < end):
+                        heapq.heappush(heap, (s, e, app))
+                i += 1
+            if heap:
+                s, e, app = heapq.heappop(heap)
+                yield app, s, e
+
+    def drop_before(self, cutoff):
+        with self._lock:
+            kept = [b for b in self.blocks if b["end"] > cutoff]
+            dropped = len(self.blocks) - len(kept)
+            if not dropped:
+                return 0, 0
+            self._set_blocks(kept)
+            self._write_index()
+            live = {b["file"] for b in kept}
+        reclaimed = 0
+        for p in self.path.glob("pack-*.bin"):
+            if p.name not in live:
+                reclaimed += file_size(p)
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+        return dropped, reclaimed
+
+    def size(self):
+        return sum(file_size(p) for p in self.path.glob("pack-*.bin"))
+
+class PersistenceWorker:
+    def __init__(self, maxsize=PERSIST_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._put_lock = threading.Lock()
+        self._pending = {}
+        self._closed = False
+        self.latencies = deque(maxlen=512)
+        self.batches = 0
+        self.coalesced = 0
+        self.overflows = 0
+        self.errors = 0
+        self.max_depth = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        with self._put_lock:
+            if self._closed:
+                return False
+            try:
+                self._queue.put(item, timeout=PERSIST_PUT_TIMEOUT)
+            except queue.Full:
+                self.overflows += 1
+                return False
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def append(self, sink, item):
+        if not self._put(("append", sink, item)):
+            self._call(sink, [item])
+
+    def notify(self, key, fn):
+        with self._lock:
+            queued = key in self._pending
+            self._pending[key] = fn
+        if queued:
+            self.coalesced += 1
+            return
+        if not self._put(("notify", key, None)):
+            self._run_key(key)
+
+    def flush(self, timeout=None):
+        done = threading.Event()
+        if self._put(("flush", None, done)):
+            return done.wait(timeout)
+        return True
+
+    def close(self, timeout=None):
+        with self._put_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(("stop", None, None))
+        self._thread.join(timeout)
+
+    def _call(self, fn, *args):
+        try:
+            fn(*args)
+        except:
+            self.errors += 1
+
+    def _run_key(self, key):
+        with self._lock:
+            fn = self._pending.pop(key, None)
+        if fn:
+            self._call(fn)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            t0 = time.perf_counter()
+            appends = {}
+            keys = []
+            events = []
+            stop = False
+            for kind, target, item in batch:
+                if kind == "append":
+                    appends.setdefault(target, []).append(item)
+                elif kind == "notify":
+                    keys.append(target)
+                elif kind == "flush":
+                    events.append(item)
+                else:
+                    stop = True
+            for sink, items in appends.items():
+                self._call(sink, items)
+            for key in keys:
+                self._run_key(key)
+            self.batches += 1
+            self.latencies.append(time.perf_counter() - t0)
+            for done in events:
+                done.set()
+            if stop:
+                return
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        pick = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000 if lat else 0.0
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "overflows": self.overflows,
+            "errors": self.errors,
+            "write_ms_p50": pick(0.50),
+            "write_ms_p95": pick(0.95),
+            "write_ms_max": lat[-1] * 1000 if lat else 0.0,
+        }
+
+def format_ago(now_ts, last_ts):
+    if not last_ts:
+        return "Never"
+    diff = max(0, now_ts - last_ts)
+    if diff < 60:
+        return f"{int(diff)} seconds ago"
+    if diff < 3600:
+        return f"{int(diff // 60)} minutes ago"
+    if diff < 86400:
+        return f"{int(diff // 3600)} hours ago"
+    return f"{int(diff // 86400)} days ago"
+
+def export_rows(data, last_used, week, order="most"):
+    if order == "last":
+        keys = sorted(data, key=lambda a: last_used.get(a, 0), reverse=True)
+    else:
+        keys = sorted(data, key=lambda a: -data[a])
+    return ((app, data[app], last_used.get(app), week.get(app, 0)) for app in keys), len(keys)
+
+def retention_cutoff(settings, key, now, align="hour"):
+    days = settings.get(key, 0)
+    if not days:
+        return None
+    cutoff = now - days * 86400
+    if align == "day":
+        lt = time.localtime(cutoff)
+        return time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday, 0, 0, 0, 0, 0, -1))
+    return cutoff - (cutoff + time.localtime(cutoff).tm_gmtoff) % 3600
+
+def range_totals(rollups, history, start_ts, end_ts, segments=None, raw_floor=None, cold=None):
+    if not (segments or history):
+        return rollups.totals("hour", start_ts, end_ts)
+    totals = {}
+    if raw_floor and start_ts < raw_floor:
+        if rollups is not None:
+            totals = rollups.totals("hour", start_ts, min(end_ts, raw_floor))
+        start_ts = raw_floor
+    if end_ts <= start_ts:
+        return totals
+    raw = segments.totals(start_ts, end_ts) if segments else dict(history.top_apps(start_ts, end_ts, -1))
+    if cold is not None:
+        cold.totals(start_ts, end_ts, raw)
+    for app, seconds in raw.items():
+        totals[app] = totals.get(app, 0) + seconds
+    return totals
+
+class TextExport:
+    binary = False
+    newline = None
+
+    def begin(self, f):
+        pass
+
+    def write(self, f, rows, now):
+        for app, seconds, ts, week in rows:
+            time_str = time.strftime("%H:%M:%S", time.gmtime(int(seconds)))
+            week_str = time.strftime("%H:%M:%S", time.gmtime(int(week)))
+            if ts:
+                last_used_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+                f.write(f"{app}: {time_str} (This week: {week_str} | Last used: {last_used_str} | {format_ago(now, ts)})\n")
+            else:
+                f.write(f"{app}: {time_str} (This week: {week_str} | Last used: Never)\n")
+
+    def end(self, f):
+        pass
+
+class CsvExport(TextExport):
+    newline = ""
+
+    def begin(self, f):
+        import csv
+        self._writer = csv.writer(f, lineterminator="\n")
+        self._writer.writerow(["app", "seconds", "last_used", "this_week_seconds"])
+
+    def write(self, f, rows, now):
+        self._writer.writerows((app, round(seconds, 3), ts or "", round(week, 3)) for app, seconds, ts, week in rows)
+
+class JsonLinesExport(TextExport):
+    def write(self, f, rows, now):
+        f.write("".join(
+            json.dumps({"app": app, "seconds": seconds, "last_used": ts, "this_week": week}, separators=(",", ":")) + "\n"
+            for app, seconds, ts, week in rows
+        ))
+
+class ColumnarExport(TextExport):
+    binary = True
+
+    def begin(self, f):
+        f.write(EXPORT_MAGIC + struct.pack("<H", EXPORT_VERSION))
+
+    def write(self, f, rows, now):
+        names = "\0".join(row[0] for row in rows).encode("utf-8")
+        f.write(struct.pack("<II", len(rows), len(names)))
+        f.write(names)
+        for i in (1, 2, 3):
+            array("d", (row[i] or 0.0 for row in rows)).tofile(f)
+
+    def end(self, f):
+        f.write(struct.pack("<II", 0, 0))
+
+EXPORT_FORMATS = {"txt": TextExport, "csv": CsvExport, "jsonl": JsonLinesExport, "ase": ColumnarExport}
+
+def read_columnar_export(path):
+    with open(path, "rb") as f:
+        if f.read(len(EXPORT_MAGIC)) != EXPORT_MAGIC:
+            raise ValueError("not an AllSeeingEye columnar export")
+        struct.unpack("<H", f.read(2))
+        while True:
+            n, names_len = struct.unpack("<II", f.read(8))
+            if n == 0:
+                return
+            names = f.read(names_len).decode("utf-8").split("\0")
+            columns = []
+            for _ in range(3):
+                col = array("d")
+                col.fromfile(f, n)
+                columns.append(col)
+            for i in range(n):
+                yield names[i], columns[0][i], columns[1][i] or None, columns[2][i]
+
+class ExportCancelled(Exception):
+    pass
+
+class ExportJob:
+    def __init__(self, rows_fn, path, fmt=None, chunk_size=EXPORT_CHUNK):
+        self.rows_fn = rows_fn
+        self.path = Path(path)
+        self.fmt = (fmt or self.path.suffix.lstrip(".") or "txt").lower()
+        if self.fmt not in EXPORT_FORMATS:
+            raise ValueError(f"unknown export format: {self.fmt}")
+        self.chunk_size = chunk_size
+        self.done = 0
+        self.total = None
+        self.error = None
+        self.finished = threading.Event()
+        self._cancel = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        exporter = EXPORT_FORMATS[self.fmt]()
+        tmp_path = self.path.with_suffix(self.path.suffix + ".part")
+        now = time.time()
+        try:
+            rows, self.total = self.rows_fn()
+            mode = "wb" if exporter.binary else "w"
+            with open(tmp_path, mode, **({} if exporter.binary else {"encoding": "utf-8", "newline": exporter.newline})) as f:
+                exporter.begin(f)
+                chunk = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) >= self.chunk_size:
+                        if self.cancelled:
+                            raise ExportCancelled()
+                        exporter.write(f, chunk, now)
+                        self.done += len(chunk)
+                        chunk = []
+                if chunk:
+                    exporter.write(f, chunk, now)
+                    self.done += len(chunk)
+                exporter.end(f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            if not isinstance(e, ExportCancelled):
+                self.error = e
+            try:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            except:
+                pass
+        finally:
+            self.finished.set()
+
+def read_export(path):
+    path = Path(path)
+    fmt = path.suffix.lstrip(".").lower()
+    if fmt == "ase":
+        for app, seconds, last, _ in read_columnar_export(path):
+            yield app, seconds, last
+    elif fmt == "csv":
+        import csv
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                yield row["app"], float(row["seconds"] or 0), float(row["last_used"]) if row.get("last_used") else None
+    elif fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    yield rec["app"], float(rec.get("seconds") or 0), rec.get("last_used")
+    else:
+        raise ValueError(f"cannot read {fmt or 'unknown'} files; use a data directory or a csv, jsonl or ase export")
+
+def read_machine_state(path):
+    path = Path(path)
+    state = {}
+    if path.is_dir():
+        data, last_used, _, _ = load_state_with_journal(path, compact=False)
+        for app, (total, last) in load_json_with_backup(data_path(path, ARCHIVE_FILE), data_path(path, ARCHIVE_BAK)).items():
+            data.setdefault(app, total)
+            last_used.setdefault(app, last)
+        for app, total in data.items():
+            state[app] = (float(total), float(last_used.get(app) or 0))
+    else:
+        for app, seconds, last in read_export(path):
+            state[app] = (seconds, float(last or 0))
+    return state
+
+def fleet_machine_id(path):
+    path = Path(path)
+    if path.is_dir():
+        return path.parent.name if path.name == APPDATA_DIR.name else path.name
+    return path.stem
+
+def merge_machine_state(state, other):
+    for app, (total, last) in other.items():
+        old = state.get(app)
+        state[app] = (max(total, old[0]), max(last, old[1])) if old else (total, last)
+    return state
+
+def write_fleet_run(path: Path, rows):
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    exporter = ColumnarExport()
+    with open(tmp_path, "wb") as f:
+        exporter.begin(f)
+        chunk = []
+        for app, total, last in rows:
+            chunk.append((app, total, last, 0.0))
+            if len(chunk) >= EXPORT_CHUNK:
+                exporter.write(f, chunk, 0)
+                chunk = []
+        if chunk:
+            exporter.write(f, chunk, 0)
+        exporter.end(f)
+    os.replace(tmp_path, path)
+
+def merge_fleet_runs(paths):
+    import heapq
+    current = None
+    for app, total, last, _ in heapq.merge(*(read_columnar_export(p) for p in paths), key=lambda row: row[0]):
+        last = last or 0.0
+        if current is not None and current[0] == app:
+            current = (app, current[1] + total, max(current[2], last))
+            continue
+        if current is not None:
+            yield current
+        current = (app, total, last)
+    if current is not None:
+        yield current
+
+def _fleet_ingest_task(task):
+    run_path, paths = task
+    state = {}
+    if run_path.exists():
+        state = {app: (total, last or 0.0) for app, total, last, _ in read_columnar_export(run_path)}
+    errors = []
+    for p in paths:
+        try:
+            merge_machine_state(state, read_machine_state(p))
+        except Exception as e:
+            errors.append(f"{p}: {e}")
+    write_fleet_run(run_path, ((app, total, last) for app, (total, last) in sorted(state.items())))
+    return len(state), errors
+
+def _fleet_merge_task(task):
+    paths, out_path = task
+    write_fleet_run(out_path, merge_fleet_runs(paths))
+    return out_path
+
+class FleetStore:
+    def __init__(self, path, workers=None):
+        self.path = Path(path)
+        self.machines_dir = self.path / "machines"
+        self.machines_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+
+    def run_path(self, machine):
+        return self.machines_dir / (re.sub(r"[^\w.-]", "_", machine) + ".ase")
+
+    def runs(self):
+        return sorted(self.machines_dir.glob("*.ase"))
+
+    def _map(self, fn, tasks):
+        from concurrent.futures import ProcessPoolExecutor
+        workers = min(self.workers or os.cpu_count() or 1, len(tasks))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(fn, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+
+    def ingest(self, paths):
+        tasks = {}
+        for p in paths:
+            run_path = self.run_path(fleet_machine_id(p))
+            tasks.setdefault(run_path, []).append(str(p))
+        tasks = list(tasks.items())
+        stats = {"files": sum(len(ps) for _, ps in tasks), "machines": len(tasks), "rows": 0, "errors": []}
+        if not tasks:
+            return stats
+        for rows, errors in self._map(_fleet_ingest_task, tasks):
+            stats["rows"] += rows
+            stats["errors"] += errors
+        return stats
+
+    def merged(self):
+        import tempfile
+        runs = self.runs()
+        with tempfile.TemporaryDirectory(prefix="merge-", dir=self.path) as tmp:
+            level = 0
+            while len(runs) > FLEET_FANIN:
+                groups = [runs[i:i + FLEET_FANIN] for i in range(0, len(runs), FLEET_FANIN)]
+                tasks = [(group, Path(tmp) / f"{level}-{i}.ase") for i, group in enumerate(groups)]
+                runs = list(self._map(_fleet_merge_task, tasks))
+                level += 1
+            yield from merge_fleet_runs(runs)
+
+    def export_rows(self, order="name"):
+        rows = ((app, total, last or None, 0.0) for app, total, last in self.merged())
+        if order == "name":
+            return rows, None
+        rows = list(rows)
+        if order == "last":
+            rows.sort(key=lambda row: row[2] or 0, reverse=True)
+        else:
+            rows.sort(key=lambda row: -row[1])
+        return rows, len(rows)
+
 def _startup_shortcut_path():
     return Path(os.getenv("APPDATA")) / "Microsoft" / "Windows" / "Start Menu" / "Programs" / "Startup" / "AllSeeingEye.lnk"
 
@@ -152,10 +2054,7 @@ def set_startup_hklm_no_elev(enable):
                 except FileNotFoundError:
                     pass
     except Exception as e:
-        try:
-            messagebox.showerror("Startup Setting Error", f"Error setting startup: {e}")
-        except:
-            pass
+        show_message("showerror", "Startup Setting Error", f"Error setting startup: {e}")
 
 def set_startup(enable, user=True):
     if user:
@@ -173,10 +2072,7 @@ def set_startup(enable, user=True):
                 shortcut.IconLocation = icon
                 shortcut.Save()
             except Exception as e:
-                try:
-                    messagebox.showerror("Startup Setting Error", f"Error setting startup: {e}")
-                except:
-                    pass
+                show_message("showerror", "Startup Setting Error", f"Error setting startup: {e}")
         else:
             try:
                 if lnk.exists():
@@ -189,122 +2085,926 @@ def set_startup(enable, user=True):
         if relaunch_as_admin_with_task(task):
             return
         else:
-            try:
-                messagebox.showerror("Admin Required", "You must run as administrator to set startup for all users.")
-            except:
-                pass
+            show_message("showerror", "Admin Required", "You must run as administrator to set startup for all users.")
             return
     set_startup_hklm_no_elev(enable)
 
-def ensure_single_instance():
-    h_mutex = win32event.CreateMutex(None, False, "Global\\AllSeeingEyeMutex")
+def ensure_single_instance(role="tracker"):
+    try:
+        import win32event
+        import win32api
+        import winerror
+    except ImportError:
+        return None
+    h_mutex = win32event.CreateMutex(None, False, "Global\\AllSeeingEyeMutex" if role == "tracker" else "Global\\AllSeeingEyeGUIMutex")
     if win32api.GetLastError() == winerror.ERROR_ALREADY_EXISTS:
-        try:
-            messagebox.showinfo("AllSeeingEye", "Already running.")
-        except:
-            pass
+        show_message("showinfo", "AllSeeingEye", "Already running.")
         sys.exit(0)
     return h_mutex
 
-class AppTracker:
+TrackerSnapshot = namedtuple("TrackerSnapshot", ["version", "current_app", "start_time", "recent"])
+
+class Histogram:
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        import bisect
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Metrics:
     def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    def gauge(self, name, fn):
+        self.gauges[name] = fn
+
+    def timed(self, name, fn):
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(name, time.perf_counter() - t0)
+        return wrapper
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {name: (list(h.counts), h.sum, h.count, h.buckets) for name, h in self.histograms.items()}
+        for name, value in sorted(counters.items()):
+            lines += [f"# TYPE {METRICS_PREFIX}{name} counter", f"{METRICS_PREFIX}{name} {value}"]
+        for name, fn in sorted(self.gauges.items()):
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            lines += [f"# TYPE {METRICS_PREFIX}{name} gauge", f"{METRICS_PREFIX}{name} {value:.12g}"]
+        for name, (counts, total, count, buckets) in sorted(histograms.items()):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} histogram")
+            cumulative = 0
+            for le, n in zip(buckets + (float("inf"),), counts):
+                cumulative += n
+                label = "+Inf" if le == float("inf") else f"{le:g}"
+                lines.append(f'{METRICS_PREFIX}{name}_bucket{{le="{label}"}} {cumulative}')
+            lines += [f"{METRICS_PREFIX}{name}_sum {total:.9g}", f"{METRICS_PREFIX}{name}_count {count}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+class InstrumentedLock:
+    def __init__(self, metrics):
+        self._lock = threading.Lock()
+        self._metrics = metrics
+        self._acquired = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        if ok:
+            self._acquired = time.perf_counter()
+            self._metrics.observe("lock_wait_seconds", self._acquired - t0)
+        return ok
+
+    def release(self):
+        held = time.perf_counter() - self._acquired
+        self._lock.release()
+        self._metrics.observe("lock_hold_seconds", held)
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class PollScheduler:
+    def __init__(self, min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL, backoff=POLL_BACKOFF):
+        self.min_interval = max(0.01, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.backoff = max(1.0, float(backoff))
+        self.interval = self.min_interval
+        self.wakeups = 0
+        self._first_wakeup = None
+        self._last_wakeup = None
+
+    def tick(self, now):
+        self.wakeups += 1
+        if self._first_wakeup is None:
+            self._first_wakeup = now
+        self._last_wakeup = now
+
+    def next_interval(self, now, changed, idle_time, idle_threshold):
+        self.tick(now)
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        interval = self.interval
+        if idle_time < idle_threshold:
+            interval = min(interval, max(self.min_interval, idle_threshold - idle_time))
+        return interval
+
+    def wakeups_per_hour(self):
+        if self._first_wakeup is None or self._last_wakeup <= self._first_wakeup:
+            return 0.0
+        return (self.wakeups - 1) * 3600.0 / (self._last_wakeup - self._first_wakeup)
+
+def regex_prefix(pattern):
+    depth = 0
+    escaped = False
+    for c in pattern:
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return ""
+    prefix = re.match(r"[^.^$*+?{}\[\]\\|()]*", pattern).group()
+    if pattern[len(prefix):len(prefix) + 1] in ("*", "?", "{"):
+        prefix = prefix[:-1]
+    return prefix.casefold()
+
+class AppFilter:
+    def __init__(self, allow=(), block=()):
+        self.allow = list(allow)
+        self.block = list(block)
+        self.errors = []
+        self._allow = self._compile(self.allow)
+        self._block = self._compile(self.block)
+        self.allow_all = not self.allow
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _compile(self, rules):
+        names = set()
+        paths = set()
+        name_rules = {}
+        path_rules = {}
+        for rule in rules:
+            rule = rule.strip()
+            if not rule:
+                continue
+            suffix = pattern = None
+            if rule[:3].lower() == "re:":
+                pattern = rule[3:]
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    self.errors.append(f"{rule}: {e}")
+                    continue
+                prefix = regex_prefix(pattern)
+                target = path_rules if "/" in pattern else name_rules
+            else:
+                is_path = "\\" in rule or "/" in rule
+                rule = rule.replace("\\", "/").casefold()
+                prefix = re.split(r"[*?\[]", rule, 1)[0]
+                if prefix == rule:
+                    (paths if is_path else names).add(rule)
+                    continue
+                rest = rule[len(prefix) + 1:]
+                if rule[len(prefix)] == "*" and not any(c in rest for c in "*?["):
+                    suffix = rest
+                else:
+                    pattern = fnmatch.translate(rule)
+                target = path_rules if is_path else name_rules
+            bucket = target.setdefault(prefix, [[], []])
+            if pattern is None:
+                bucket[0].append(suffix)
+            else:
+                bucket[1].append(f"(?:{pattern})")
+        return names, paths, name_rules, path_rules
+
+    def _search(self, rules, value):
+        if not rules:
+            return False
+        for i in range(len(value) + 1):
+            bucket = rules.get(value[:i])
+            if bucket is None:
+                continue
+            suffixes, matcher = bucket
+            rest = value[i:]
+            for suffix in suffixes:
+                if rest.endswith(suffix):
+                    return True
+            if isinstance(matcher, list):
+                matcher = bucket[1] = re.compile("|".join(matcher), re.IGNORECASE).fullmatch if matcher else None
+            if matcher and matcher(value):
+                return True
+        return False
+
+    def _match(self, compiled, name, path):
+        names, paths, name_rules, path_rules = compiled
+        if name in names:
+            return True
+        if self._search(name_rules, name):
+            return True
+        return bool(path) and (path in paths or self._search(path_rules, path))
+
+    def decide(self, app, path=None):
+        key = (app, path)
+        allowed = self._cache.get(key)
+        if allowed is not None:
+            self.hits += 1
+            return allowed
+        self.misses += 1
+        name = app.casefold()
+        if path:
+            path = path.replace("\\", "/").casefold()
+        if self._match(self._block, name, path):
+            allowed = False
+        else:
+            allowed = self.allow_all or self._match(self._allow, name, path)
+        if len(self._cache) >= FILTER_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = allowed
+        return allowed
+
+    def stats(self):
+        return {
+            "allow_rules": len(self.allow),
+            "block_rules": len(self.block),
+            "errors": len(self.errors),
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._cache),
+        }
+
+class AppTracker:
+    def __init__(self, source=None, data_dir=None):
         self.running = True
-        self.data = load_json_with_backup(DATA_FILE, DATA_BAK)
-        self.settings = load_json_with_backup(SETTINGS_FILE, SETTINGS_BAK)
+        self.data_dir = Path(data_dir) if data_dir else APPDATA_DIR
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        replayed = []
+        self.data, self.last_used, self.rollups, seq = load_state_with_journal(self.data_dir, intervals=replayed)
+        self.journal = SessionJournal(data_path(self.data_dir, JOURNAL_FILE), data_path(self.data_dir, JOURNAL_OLD), seq)
+        self.settings = load_json_with_backup(data_path(self.data_dir, SETTINGS_FILE), data_path(self.data_dir, SETTINGS_BAK))
+        self.archive = load_json_with_backup(data_path(self.data_dir, ARCHIVE_FILE), data_path(self.data_dir, ARCHIVE_BAK))
+        for app in [a for a in self.archive if a in self.data]:
+            if self.last_used.get(app, 0) > self.archive[app][1]:
+                del self.archive[app]
+            else:
+                self.data.pop(app, None)
+                self.last_used.pop(app, None)
+        self._restored = {}
+        if source is None:
+            source = Win32EventSource() if self.settings.get("event_driven", 0) else Win32PollSource()
+        self.source = source
+        self.metrics = None
+        if self.settings.get("metrics", 0):
+            self._enable_metrics()
         self.recent_apps = []
         self.current_app = None
-        self.start_time = time.time()
-        self.lock = threading.Lock()
-        self.last_used = load_json_with_backup(LAST_USED_FILE, LAST_USED_BAK)
+        self.start_time = self.source.now()
+        self.lock = InstrumentedLock(self.metrics) if self.metrics else threading.Lock()
+        self._changed = threading.Condition(self.lock)
+        self.version = 0
+        self.snapshot = TrackerSnapshot(0, None, self.start_time, ())
+        self._touched = set()
+        self.shared = None
+        self._changes = deque(maxlen=CHANGE_LOG_SIZE)
+        self._changes_floor = 0
         self.whitelist = set(self.settings.get("whitelist", []))
+        self.blocklist = set(self.settings.get("blocklist", []))
+        self.filter = AppFilter(self.whitelist, self.blocklist)
+        self._groups = None
+        self._apply_groups()
         self.idle_threshold = 300
-        self._dirty_data = False
-        self._dirty_settings = False
-        self._dirty_last_used = False
-        self._last_save = time.time()
+        self.scheduler = PollScheduler(
+            self.settings.get("poll_min_interval", POLL_MIN_INTERVAL),
+            self.settings.get("poll_max_interval", POLL_MAX_INTERVAL),
+        )
+        self.history = None
+        if self.settings.get("history_db", 0):
+            try:
+                self.history = HistoryStore(data_path(self.data_dir, HISTORY_DB))
+                if not self.history.seed_totals(self.data, self.last_used):
+                    self._restore_buffered(self.history.add_segment, self.history.flush, self.history.last_end(), replayed)
+            except Exception:
+                self.history = None
+        self.segments = None
+        if self.settings.get("segment_history", 0):
+            self.segments = SegmentStore(data_path(self.data_dir, SEGMENTS_DIR))
+            self._restore_buffered(self.segments.add, self.segments.flush, self.segments.last_end(), replayed)
+        self.cold = None
+        if self.settings.get("cold_after_days", 0):
+            self.cold = ColdStore(data_path(self.data_dir, COLD_DIR), self.settings.get("cold_codec", "lzma"))
+        self.titles = None
+        self.current_title = None
+        self.title_start = self.start_time
+        if self.settings.get("track_titles", 0):
+            self.titles = TitleStore.load(data_path(self.data_dir, TITLES_FILE))
+            self.title_normalizer = TitleNormalizer(self.settings.get("title_rules"))
+        self.writer = PersistenceWorker()
+        self.intervals = None
+        if self.segments is not None or self.history is not None:
+            self.intervals = IntervalIndex()
+            threading.Thread(target=self._load_intervals, daemon=True).start()
+        self.first_tick = threading.Event()
+        self._last_save = self.source.now()
+        self._titles_saved = self._last_save
+        self._segments_flushed = self._last_save
+        self._metrics_written = self._last_save
+        self._retention_at = self._last_save - RETENTION_INTERVAL + RETENTION_DELAY
+        self._retention_thread = None
+        self.retention_stats = {}
 
     def start(self):
         threading.Thread(target=self.track_loop, daemon=True).start()
 
-    def _maybe_save(self, force=False):
-        now = time.time()
+    def recent_rows(self, n=3):
+        if self.history:
+            return self.history.totals("last_used", n).fetchall()
+        return list(self.snapshot.recent[:n])
+
+    def changes_since(self, version=None):
+        now = self.source.now()
+        with self.lock:
+            today = self.rollups.buckets["day"].get(rollup_label("day", now), {})
+            if version is None or version < self._changes_floor or version > self.version:
+                apps = list(self.data)
+                full = True
+            else:
+                apps = set()
+                for v, app in reversed(self._changes):
+                    if v <= version:
+                        break
+                    apps.add(app)
+                full = False
+            rows = [[app, self.data.get(app), self.last_used.get(app), today.get(app, 0.0)] for app in apps]
+            return {"version": self.version, "day": rollup_label("day", now), "full": full, "rows": rows}
+
+    def rollup_totals(self, level, start_ts=None, end_ts=None):
+        with self.lock:
+            if start_ts is None:
+                return self.rollups.bucket(level, self.source.now())
+            return self.rollups.totals(level, start_ts, end_ts)
+
+    def range_totals(self, start_ts, end_ts):
+        if not (self.segments or self.history):
+            with self.lock:
+                return self.rollups.totals("hour", start_ts, end_ts)
+        raw_floor = retention_cutoff(self.settings, "retention_raw_days", self.source.now())
+        totals = {}
+        if raw_floor and start_ts < raw_floor:
+            with self.lock:
+                totals = self.rollups.totals("hour", start_ts, min(end_ts, raw_floor))
+        if self.intervals.loaded:
+            raw = self.intervals.totals(max(start_ts, raw_floor or start_ts), end_ts)
+            if self.cold is not None:
+                self.cold.totals(max(start_ts, raw_floor or start_ts), end_ts, raw)
+        else:
+            raw = range_totals(None, self.history, start_ts, end_ts, self.segments, raw_floor, self.cold)
+        for app, seconds in raw.items():
+            totals[app] = totals.get(app, 0) + seconds
+        return totals
+
+    def export_rows(self, order="most", start_ts=None, end_ts=None):
+        now = self.source.now()
+        ranged = start_ts is not None or end_ts is not None
+        if ranged:
+            data = self.range_totals(start_ts or 0, end_ts or now)
+        with self.lock:
+            week = self.rollups.bucket("week", now)
+            last_used = dict(self.last_used)
+            if not ranged and not self.history:
+                data = dict(self.data)
+            for app, (total, last) in self.archive.items():
+                last_used.setdefault(app, last)
+                if not ranged and not self.history:
+                    data.setdefault(app, total)
+        if self.history and not ranged:
+            cursor = self.history.totals("total" if order == "most" else "last_used")
+            rows = ((app, seconds, ts or None, week.get(app, 0)) for app, seconds, ts in cursor)
+            return rows, len(self.history._app_ids)
+        return export_rows(data, last_used, week, order)
+
+    def _load_intervals(self):
+        try:
+            if self.segments is not None:
+                self.intervals.seed(self.segments.intervals())
+            else:
+                self.intervals.seed(self.history.segments(float("-inf"), float("inf")))
+        except Exception:
+            pass
+
+    def app_at(self, ts):
+        with self.lock:
+            if self.current_app and self.start_time <= ts:
+                return self.current_app, self.start_time, None
+        if self.intervals is None:
+            return None
+        return self.intervals.app_at(ts)
+
+    def _enable_metrics(self):
+        global _metrics
+        metrics = self.metrics = _metrics = Metrics()
+        self.source.active_app = metrics.timed("active_app_seconds", self.source.active_app)
+        self.source.idle_seconds = metrics.timed("idle_probe_seconds", self.source.idle_seconds)
+        metrics.gauge("uptime_seconds", lambda: time.time() - metrics.started)
+        metrics.gauge("apps", lambda: len(self.data))
+        metrics.gauge("writer_queue_depth", lambda: self.writer.stats()["queue_depth"])
+        metrics.gauge("writer_overflows", lambda: self.writer.overflows)
+        metrics.gauge("journal_bytes_written", lambda: self.journal.bytes_written)
+        metrics.gauge("poll_wakeups_per_hour", lambda: self.scheduler.wakeups_per_hour())
+        metrics.gauge("process_cache_hits", lambda: _process_cache.hits)
+        metrics.gauge("process_cache_misses", lambda: _process_cache.misses)
+        metrics.gauge("resident_memory_bytes", lambda: __import__("psutil").Process().memory_info().rss)
+
+    def _write_metrics(self):
+        self.metrics.write(data_path(self.data_dir, METRICS_FILE))
+
+    def _retention_due(self):
+        keys = ("retention_raw_days", "retention_hourly_days", "archive_after_months", "cold_after_days")
+        if self.segments is None and not any(self.settings.get(key, 0) for key in keys):
+            return False
+        return self._retention_thread is None or not self._retention_thread.is_alive()
+
+    def _archive_candidates(self, apps, cutoff):
+        found = {}
+        for app in apps:
+            last = self.last_used.get(app)
+            if last is not None and last < cutoff and app != self.current_app and app in self.data:
+                found[app] = [self.data[app], last]
+        self.archive.update(found)
+        return found
+
+    def _archive_drop(self, found):
+        dropped = 0
+        for app, (total, last) in found.items():
+            if self.last_used.get(app) == last and app != self.current_app:
+                self.data.pop(app, None)
+                self.last_used.pop(app, None)
+                self._touched.add(app)
+                dropped += 1
+            elif self.archive.get(app) == [total, last]:
+                del self.archive[app]
+        return dropped
+
+    def run_retention(self, now=None):
+        if now is None:
+            now = self.source.now()
+        t0 = time.perf_counter()
+        stats = {"ran_at": now, "archived_apps": 0, "hour_buckets": 0, "segment_files": 0, "segments_merged": 0, "history_rows": 0, "cold_blocks": 0, "cold_rows": 0, "max_lock_ms": 0.0}
+        def locked(fn, *args):
+            with self.lock:
+                t = time.perf_counter()
+                result = fn(*args)
+                stats["max_lock_ms"] = max(stats["max_lock_ms"], (time.perf_counter() - t) * 1000)
+            return result
+        files = [data_path(self.data_dir, p) for p in (SNAPSHOT_FILE, DATA_FILE, LAST_USED_FILE, ROLLUPS_FILE, ARCHIVE_FILE)]
+        size = lambda: sum(file_size(p) for p in files)
+        before = size()
+        reclaimed = 0
+        months = self.settings.get("archive_after_months", 0)
+        if months:
+            archive_cutoff = now - months * 30 * 86400
+            apps = locked(list, self.last_used)
+            found = {}
+            for i in range(0, len(apps), RETENTION_CHUNK):
+                found.update(locked(self._archive_candidates, apps[i:i + RETENTION_CHUNK], archive_cutoff))
+            if found:
+                archive = locked(dict, self.archive)
+                atomic_write_json(data_path(self.data_dir, ARCHIVE_FILE), archive, data_path(self.data_dir, ARCHIVE_BAK))
+                items = list(found.items())
+                for i in range(0, len(items), RETENTION_CHUNK):
+                    stats["archived_apps"] += locked(self._archive_drop, dict(items[i:i + RETENTION_CHUNK]))
+        hour_cutoff = retention_cutoff(self.settings, "retention_hourly_days", now, "day")
+        if hour_cutoff:
+            while True:
+                n = locked(self.rollups.prune, "hour", hour_cutoff)
+                stats["hour_buckets"] += n
+                if n < RETENTION_CHUNK:
+                    break
+        raw_cutoff = retention_cutoff(self.settings, "retention_raw_days", now)
+        if self.segments is not None:
+            if raw_cutoff:
+                stats["segment_files"], freed = self.segments.drop_before(raw_cutoff)
+                reclaimed += freed
+            stats["segments_merged"], freed = self.segments.compact()
+            reclaimed += freed
+        if raw_cutoff and self.intervals is not None:
+            self.intervals.drop_before(raw_cutoff)
+            if self.cold is not None:
+                reclaimed += self.cold.drop_before(raw_cutoff)[1]
+        cold_cutoff = retention_cutoff(self.settings, "cold_after_days", now, "day")
+        if self.cold is not None and cold_cutoff and cold_cutoff > self.cold.sealed_until and (self.segments or self.history):
+            reclaimed += self._seal_cold(cold_cutoff, stats)
+        if raw_cutoff and self.history:
+            try:
+                stats["history_rows"], freed = self.history.drop_before(raw_cutoff)
+                reclaimed += freed
+            finally:
+                self.history.close()
+        if stats["archived_apps"] or stats["hour_buckets"]:
+            self.writer.notify("compact", self._compact_journal)
+            self.writer.flush()
+        stats["bytes_reclaimed"] = before - size() + reclaimed
+        stats["duration_ms"] = (time.perf_counter() - t0) * 1000
+        self.retention_stats = stats
+        try:
+            with data_path(self.data_dir, RETENTION_LOG).open("a", encoding="utf-8") as f:
+                f.write(json.dumps(stats, separators=(",", ":")) + "\n")
+        except OSError:
+            pass
+        return stats
+
+    def _seal_cold(self, cutoff, stats):
+        readers = []
+        if self.segments is not None:
+            readers = self.segments.readers()
+            found = (row for reader in readers if reader.min_start < cutoff for row in reader.intervals())
+        else:
+            found = (tuple(row) for row in self.history.segments(float("-inf"), cutoff))
+        rows = []
+        floor = cutoff
+        try:
+            for row in found:
+                if row[2] <= cutoff:
+                    rows.append(row)
+                elif row[1] < floor:
+                    floor = row[1]
+        finally:
+            if readers:
+                self.segments.release(readers)
+        stats["cold_blocks"], stats["cold_rows"], written = self.cold.seal(rows, cutoff)
+        del rows
+        freed = 0
+        if self.segments is not None:
+            freed += self.segments.drop_before(cutoff, exact=True)[1]
+        if self.history:
+            try:
+                freed += self.history.drop_before(cutoff)[1]
+            finally:
+                self.history.close()
+        self.intervals.drop_before(cutoff, floor)
+        return freed - written
+
+    def wait_for_change(self, version, timeout=None):
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.snapshot
+
+    def _publish(self):
+        self.version += 1
+        for app in self._touched:
+            if len(self._changes) == CHANGE_LOG_SIZE:
+                self._changes_floor = self._changes[0][0]
+            self._changes.append((self.version, app))
+        if self.shared is not None:
+            self.shared.publish(self, self._touched)
+        self._touched.clear()
+        recent = tuple((app, self.data.get(app, 0), self.last_used.get(app)) for app in self.recent_apps)
+        self.snapshot = TrackerSnapshot(self.version, self.current_app, self.start_time, recent)
+        self._changed.notify_all()
+
+    def _switch_title(self, now, title):
+        if self.current_title and self.current_app:
+            self.titles.add(self.current_app, self.current_title, self.title_start, now)
+        self.current_title = title
+        self.title_start = now
+
+    def _save_titles(self):
+        with self.lock:
+            sizes = self.titles.sizes()
+            self.titles.dirty = False
+        self.titles.save(data_path(self.data_dir, TITLES_FILE), self.titles.to_bytes(sizes))
+
+    def _close_current(self, now):
+        if self.titles is not None:
+            self._switch_title(now, None)
+        if not self.current_app:
+            return None
+        elapsed = now - self.start_time
+        self._touched.add(self.current_app)
+        self.data[self.current_app] = self.data.get(self.current_app, 0) + elapsed
+        self.last_used[self.current_app] = now
+        if self.current_app not in self.recent_apps:
+            self.recent_apps.insert(0, self.current_app)
+            self.recent_apps = self.recent_apps[:3]
+        self.rollups.add(self.current_app, self.start_time, now)
+        return self.current_app, self.start_time, now, self.journal.entry(self.current_app, self.start_time, now, base=self._restored.get(self.current_app))
+
+    def _persist(self, closed):
+        if closed is None:
+            return
+        app, start, end, line = closed
+        self.writer.append(self.journal.write_many, line)
+        if self.intervals is not None:
+            self.intervals.add(app, start, end)
+        if self.history and self.history.add_segment(app, start, end):
+            self.writer.notify("history", self.history.flush)
+        if self.segments is not None and self.segments.add(app, start, end):
+            self.writer.notify("segments", self.segments.flush)
+
+    def _write_settings(self):
+        atomic_write_json(data_path(self.data_dir, SETTINGS_FILE), dict(self.settings), data_path(self.data_dir, SETTINGS_BAK))
+
+    def _apply_groups(self):
+        groups = self.settings.get("app_groups") or None
+        if groups != self._groups:
+            self._groups = {group: list(patterns) for group, patterns in groups.items()} if groups else None
+            _process_cache.set_index(ProcessIndex(groups) if groups else None)
+
+    def save_settings(self):
+        self.filter = AppFilter(self.whitelist, self.blocklist)
+        self._apply_groups()
+        self.writer.notify("settings", self._write_settings)
+
+    def _restore_buffered(self, add, flush, horizon, rows):
+        for app, start, end in rows:
+            if horizon is None or end > horizon:
+                add(app, start, end)
+        flush()
+
+    def _compact_journal(self):
+        if self.segments is not None:
+            self.segments.flush()
+        if self.history:
+            self.history.flush()
+        with self.lock:
+            seq = self.journal.rotate()
+            if seq is None:
+                return
+            data = dict(self.data)
+            last_used = dict(self.last_used)
+            rollups = self.rollups.freeze()
+            self._restored.clear()
+        write_snapshot(data, last_used, seq, self.data_dir, rollups.to_json(seq))
+        self.journal.discard_old()
+
+    def _maybe_save(self, force=False, now=None):
+        if now is None:
+            now = self.source.now()
         if force or (now - self._last_save) >= SAVE_INTERVAL:
-            if self._dirty_data:
-                atomic_write_json(DATA_FILE, self.data, DATA_BAK)
-                self._dirty_data = False
-            if self._dirty_last_used:
-                atomic_write_json(LAST_USED_FILE, self.last_used, LAST_USED_BAK)
-                self._dirty_last_used = False
-            if self._dirty_settings:
-                atomic_write_json(SETTINGS_FILE, self.settings, SETTINGS_BAK)
-                self._dirty_settings = False
+            line = None
+            with self.lock:
+                if self.current_app and self.running:
+                    line = self.journal.entry(self.current_app, self.start_time, now, True, self._restored.get(self.current_app))
+            if line:
+                self.writer.append(self.journal.write_many, line)
+            if self.history:
+                self.writer.notify("history", self.history.flush)
+            if force or self.journal.records >= JOURNAL_COMPACT_RECORDS:
+                self.writer.notify("compact", self._compact_journal)
+            if self.segments is not None and self.segments.pending and (force or now - self._segments_flushed >= SEGMENT_FLUSH_INTERVAL):
+                self.writer.notify("segments", self.segments.flush)
+                self._segments_flushed = now
+            if self.titles is not None and self.titles.dirty and (force or now - self._titles_saved >= TITLES_SAVE_INTERVAL):
+                self.writer.notify("titles", self._save_titles)
+                self._titles_saved = now
+            if self.metrics is not None and (force or now - self._metrics_written >= METRICS_INTERVAL):
+                self.writer.notify("metrics", self._write_metrics)
+                self._metrics_written = now
+            if not force and now - self._retention_at >= RETENTION_INTERVAL and self._retention_due():
+                self._retention_at = now
+                self._retention_thread = threading.Thread(target=self.run_retention, args=(now,), daemon=True)
+                self._retention_thread.start()
+            if force:
+                if self._retention_thread is not None:
+                    self._retention_thread.join()
+                self.writer.close()
             self._last_save = now
 
+    def _observe(self, now, idle_time, app, title=None):
+        if idle_time >= self.idle_threshold:
+            app = "Idle Time"
+            title = None
+            now -= idle_time - self.idle_threshold
+        elif not app or not self.filter.decide(app, self.source.app_path(app)):
+            return False
+        if self.titles is not None:
+            title = self.title_normalizer.normalize(title)
+            if app == self.current_app and title != self.current_title:
+                with self.lock:
+                    self._switch_title(max(now, self.title_start), title)
+                return True
+        if app == self.current_app:
+            return False
+        with self.lock:
+            now = max(now, self.start_time)
+            closed = self._close_current(now)
+            if app not in self.data and app in self.archive:
+                total, last = self.archive.pop(app)
+                self.data[app] = total
+                self.last_used[app] = last
+                self._restored[app] = total
+                self._touched.add(app)
+            self.current_app = app
+            self.start_time = now
+            if self.titles is not None:
+                self._switch_title(now, title)
+            self._publish()
+        self._persist(closed)
+        return True
+
     def track_loop(self):
-        class LASTINPUTINFO(ctypes.Structure):
-            _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
-        def get_idle_duration():
-            lii = LASTINPUTINFO()
-            lii.cbSize = ctypes.sizeof(LASTINPUTINFO)
-            ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lii))
-            millis = ctypes.windll.kernel32.GetTickCount() - lii.dwTime
-            return millis / 1000.0
-        while self.running:
-            idle_time = get_idle_duration()
-            now = time.time()
-            with self.lock:
-                if idle_time >= self.idle_threshold:
-                    if self.current_app != "Idle Time":
-                        if self.current_app:
-                            elapsed = now - self.start_time
-                            self.data[self.current_app] = self.data.get(self.current_app, 0) + elapsed
-                            self.last_used[self.current_app] = now
-                            if self.current_app not in self.recent_apps:
-                                self.recent_apps.insert(0, self.current_app)
-                                self.recent_apps = self.recent_apps[:3]
-                            self._dirty_data = True
-                            self._dirty_last_used = True
-                        self.current_app = "Idle Time"
-                        self.start_time = now
+        source = self.source
+        metrics = self.metrics
+        while self.running and not source.finished:
+            t0 = time.perf_counter() if metrics else 0.0
+            app = None
+            if source.mode == "push":
+                event = source.wait(PUSH_WAKE_INTERVAL) if self.first_tick.is_set() else None
+                if event:
+                    now, app = event
                 else:
-                    app = get_active_app()
-                    if app and (app in self.whitelist or len(self.whitelist) == 0):
-                        if app != self.current_app:
-                            if self.current_app:
-                                elapsed = now - self.start_time
-                                self.data[self.current_app] = self.data.get(self.current_app, 0) + elapsed
-                                self.last_used[self.current_app] = now
-                                if self.current_app not in self.recent_apps:
-                                    self.recent_apps.insert(0, self.current_app)
-                                    self.recent_apps = self.recent_apps[:3]
-                                self._dirty_data = True
-                                self._dirty_last_used = True
-                            self.current_app = app
-                            self.start_time = now
-            self._maybe_save(False)
-            time.sleep(TRACK_INTERVAL)
+                    now = source.now()
+            else:
+                now = source.now()
+            idle_time = source.idle_seconds()
+            title = None
+            if idle_time < self.idle_threshold:
+                if app is None:
+                    app = source.active_app()
+                if self.titles is not None:
+                    title = source.active_title()
+            changed = self._observe(now, idle_time, app, title)
+            self.first_tick.set()
+            self._maybe_save(False, now)
+            if metrics:
+                metrics.observe("tick_seconds", time.perf_counter() - t0)
+                if changed:
+                    metrics.inc("focus_changes_total")
+            if source.mode == "poll":
+                source.wait(self.scheduler.next_interval(now, changed, idle_time, self.idle_threshold))
+            else:
+                self.scheduler.tick(now)
 
     def stop(self):
         self.running = False
-        now = time.time()
+        now = self.source.now()
         with self.lock:
-            if self.current_app:
-                elapsed = now - self.start_time
-                self.data[self.current_app] = self.data.get(self.current_app, 0) + elapsed
-                self.last_used[self.current_app] = now
-                if self.current_app not in self.recent_apps:
-                    self.recent_apps.insert(0, self.current_app)
-                    self.recent_apps = self.recent_apps[:3]
-                self._dirty_data = True
-                self._dirty_last_used = True
-        self._maybe_save(True)
+            now = max(now, self.start_time)
+            closed = self._close_current(now)
+            self.current_app = None
+            self._publish()
+        self._persist(closed)
+        self._maybe_save(True, now)
+        if self.segments is not None:
+            self.segments.close()
+        if self.shared is not None:
+            with self.lock:
+                self.shared.close()
+                self.shared = None
+        self.source.close()
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+class AppTableModel:
+    def __init__(self, column="total", reverse=True):
+        self.column = column
+        self.reverse = reverse
+        self.rows = {}
+        self.today_total = 0.0
+        self._keys = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _key(self, app, row):
+        if self.column == "app":
+            return app.casefold(), app
+        return row[APP_TABLE_COLUMNS.index(self.column) - 1] or 0.0, app
+
+    def _resort(self):
+        self._keys = sorted(self._key(app, row) for app, row in self.rows.items())
+
+    def load(self, rows):
+        self.rows = {row[0]: tuple(row[1:]) for row in rows}
+        self.today_total = sum(row[2] for row in self.rows.values())
+        self._resort()
+
+    def sort(self, column, reverse):
+        self.column = column
+        self.reverse = reverse
+        self._resort()
+
+    def update(self, app, row):
+        import bisect
+        old = self.rows.get(app)
+        if old == row:
+            return False
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, self._key(app, old))]
+            self.today_total -= old[2]
+        if row is None:
+            del self.rows[app]
+        else:
+            self.rows[app] = row
+            self.today_total += row[2]
+            bisect.insort(self._keys, self._key(app, row))
+        return True
+
+    def window(self, offset, count):
+        n = len(self._keys)
+        if self.reverse:
+            indexes = range(n - 1 - offset, max(-1, n - 1 - offset - count), -1)
+        else:
+            indexes = range(offset, min(n, offset + count))
+        return [(app,) + self.rows[app] for app in (self._keys[i][1] for i in indexes)]
+
+    def format(self, row, now):
+        app, total, last, today = row
+        if not last:
+            last_str = "Never"
+        elif now - last < 1:
+            last_str = "Now"
+        else:
+            last_str = time.strftime("%Y-%m-%d %H:%M", time.localtime(last))
+        share = today / self.today_total * 100 if self.today_total > 0 else 0.0
+        return app, format_duration(total), last_str, f"{share:.1f}%"
+
+class AppTableView:
+    def __init__(self, parent, rows=APP_TABLE_ROWS):
+        self.model = AppTableModel()
+        self.offset = 0
+        self.count = rows
+        self.now = time.time()
+        self.tree = ttk.Treeview(parent, columns=APP_TABLE_COLUMNS, show="headings", height=rows, selectmode="none")
+        for column, title, width, anchor in zip(APP_TABLE_COLUMNS, ("App", "Total", "Last used", "Today"), (170, 80, 120, 60), ("w", "e", "w", "e")):
+            self.tree.heading(column, text=title, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=width, anchor=anchor, stretch=column == "app")
+        self.items = [self.tree.insert("", "end", values=("", "", "", "")) for _ in range(rows)]
+        self.shown = [None] * rows
+        self.scrollbar = tk.Scrollbar(parent, orient="vertical", command=self.yview)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_to(self.offset - e.delta // 40))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.offset + 3))
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.model)))
+        elif args[0] == "scroll":
+            self.scroll_to(self.offset + int(args[1]) * (self.count if args[2] == "pages" else 1))
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.model) - self.count))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def sort_by(self, column):
+        reverse = not self.model.reverse if column == self.model.column else column != "app"
+        self.model.sort(column, reverse)
+        self.offset = 0
+        self.render()
+
+    def render(self, now=None):
+        if now is not None:
+            self.now = now
+        rows = self.model.window(self.offset, self.count)
+        for i, item in enumerate(self.items):
+            values = self.model.format(rows[i], self.now) if i < len(rows) else ("", "", "", "")
+            if values != self.shown[i]:
+                self.tree.item(item, values=values)
+                self.shown[i] = values
+        n = len(self.model)
+        self.scrollbar.set(self.offset / n if n else 0.0, min(1.0, (self.offset + self.count) / n) if n else 1.0)
 
 class TrackerGUI:
     def __init__(self, tracker):
+        load_gui_modules()
         self.tracker = tracker
         self.root = tk.Tk()
         self.root.title("AllSeeingEye")
-        self.root.geometry("400x400")
+        self.root.geometry("480x760")
         if ICON_PATH.exists():
             try:
                 self.root.iconbitmap(str(ICON_PATH))
@@ -313,11 +3013,17 @@ class TrackerGUI:
         self.recent_labels = [tk.Label(self.root, text="") for _ in range(3)]
         for lbl in self.recent_labels:
             lbl.pack(pady=2)
+        self.table_frame = tk.Frame(self.root)
+        self.table_frame.pack(fill="both", expand=True, padx=5)
+        self.table = AppTableView(self.table_frame)
+        self._table_version = None
+        self._table_day = None
+        self._table_live = None
         self.export_btn = tk.Button(self.root, text="Export Data", command=self.export_data)
         self.export_btn.pack(pady=10)
         self.whitelist_frame = tk.Frame(self.root)
         self.whitelist_frame.pack(pady=10, fill="both", expand=True)
-        tk.Label(self.whitelist_frame, text="Whitelisted Apps (empty = all):").pack()
+        tk.Label(self.whitelist_frame, text="Whitelisted Apps (empty = all), globs, re: and path rules:").pack()
         self.whitelist_listbox = tk.Listbox(self.whitelist_frame, height=6)
         self.whitelist_listbox.pack(side="left", fill="both", expand=True)
         scrollbar = tk.Scrollbar(self.whitelist_frame)
@@ -330,6 +3036,12 @@ class TrackerGUI:
         self.add_btn.grid(row=0, column=0, padx=5, pady=5)
         self.remove_btn = tk.Button(self.btn_frame, text="Remove Selected", command=self.remove_whitelist)
         self.remove_btn.grid(row=0, column=1, padx=5, pady=5)
+        self.pattern_entry = tk.Entry(self.btn_frame)
+        self.pattern_entry.grid(row=1, column=0, columnspan=2, sticky="ew", padx=5)
+        self.allow_btn = tk.Button(self.btn_frame, text="Allow Pattern", command=lambda: self.add_pattern(False))
+        self.allow_btn.grid(row=2, column=0, padx=5, pady=5)
+        self.block_btn = tk.Button(self.btn_frame, text="Block Pattern", command=lambda: self.add_pattern(True))
+        self.block_btn.grid(row=2, column=1, padx=5, pady=5)
         self.var_dark_mode = tk.IntVar(value=self.tracker.settings.get("dark_mode", 0))
         self.dark_mode_chk = tk.Checkbutton(self.root, text="Dark Mode", variable=self.var_dark_mode, command=self.toggle_dark_mode)
         self.dark_mode_chk.pack(pady=5)
@@ -344,81 +3056,130 @@ class TrackerGUI:
         self.chk_startup_all.pack(pady=5)
         self.tray_icon = None
         self.is_tray_active = False
+        self._ui_version = None
         self.update_whitelist_listbox()
         self.apply_dark_mode(self.var_dark_mode.get())
         self.update_ui()
+        self.update_table()
         self.root.protocol("WM_DELETE_WINDOW", self.minimize_to_tray)
         if self.var_start_minimized.get() == 1:
             self.minimize_to_tray()
 
     def build_tray_menu(self):
+        load_tray_modules()
         return pystray.Menu(
             pystray.MenuItem("Restore", self.restore_from_tray),
             pystray.MenuItem("Exit", self.exit_app)
         )
 
     def update_ui(self):
-        self.tracker.lock.acquire()
-        recent = list(self.tracker.recent_apps)
-        data = dict(self.tracker.data)
-        last_used = dict(self.tracker.last_used)
-        self.tracker.lock.release()
+        version = self.tracker.snapshot.version
+        if version == self._ui_version:
+            self.root.after(1000, self.update_ui)
+            return
+        self._ui_version = version
+        t0 = time.perf_counter()
+        rows = self.tracker.recent_rows(3)
         for i in range(3):
-            if i < len(recent):
-                app = recent[i]
-                seconds = int(data.get(app, 0))
-                time_str = time.strftime("%H:%M:%S", time.gmtime(seconds))
-                last_used_ts = last_used.get(app)
+            if i < len(rows):
+                app, seconds, last_used_ts = rows[i]
+                time_str = time.strftime("%H:%M:%S", time.gmtime(int(seconds)))
                 last_used_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_used_ts)) if last_used_ts else "Never"
                 self.recent_labels[i].config(text=f"{app} - {time_str} (Last used: {last_used_str})")
             else:
                 self.recent_labels[i].config(text="")
+        metrics = getattr(self.tracker, "metrics", None)
+        if metrics:
+            metrics.observe("gui_render_seconds", time.perf_counter() - t0)
         self.root.after(1000, self.update_ui)
 
-    def export_data(self):
-        def fmt_ago(now_ts, last_ts):
-            if not last_ts:
-                return "Never"
-            diff = max(0, now_ts - last_ts)
-            if diff < 60:
-                return f"{int(diff)} seconds ago"
-            if diff < 3600:
-                return f"{int(diff // 60)} minutes ago"
-            if diff < 86400:
-                return f"{int(diff // 3600)} hours ago"
-            return f"{int(diff // 86400)} days ago"
+    def update_table(self):
+        self.root.after(1000, self.update_table)
+        if self.root.state() == "withdrawn":
+            return
+        t0 = time.perf_counter()
+        now = time.time()
+        try:
+            changes = self.tracker.changes_since(self._table_version if self._table_day == rollup_label("day", now) else None)
+        except OSError:
+            return
+        model = self.table.model
+        live = self._table_live
+        if changes["full"]:
+            model.load(row for row in changes["rows"] if row[1] is not None)
+            live = None
+        else:
+            for app, total, last, today in changes["rows"]:
+                row = None if total is None else (total, last, today)
+                model.update(app, row)
+                if live and live[0] == app:
+                    live = (app, row)
+        self._table_version = changes["version"]
+        self._table_day = changes["day"]
+        snap = self.tracker.snapshot
+        if live and live[0] != snap.current_app:
+            model.update(*live)
+            live = None
+        if snap.current_app:
+            if live is None:
+                live = (snap.current_app, model.rows.get(snap.current_app))
+            total, _, today = live[1] or (0.0, None, 0.0)
+            elapsed = max(0.0, now - snap.start_time)
+            model.update(snap.current_app, (total + elapsed, now, today + elapsed))
+        self._table_live = live
+        self.table.render(now)
+        metrics = getattr(self.tracker, "metrics", None)
+        if metrics:
+            metrics.observe("gui_table_seconds", time.perf_counter() - t0)
 
+    def export_data(self):
         sort_by_most_used = messagebox.askyesno(
             "Export Sort",
             "Sort by most used?\nYes = Most used\nNo = Last used"
         )
 
-        filepath = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text Files", "*.txt")])
+        filepath = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[
+            ("Text Files", "*.txt"),
+            ("CSV", "*.csv"),
+            ("JSON Lines", "*.jsonl"),
+            ("Columnar", "*.ase"),
+        ])
         if not filepath:
             return
 
-        now = time.time()
-        self.tracker.lock.acquire()
-        seconds_map = dict(self.tracker.data)
-        last_used_map = dict(self.tracker.last_used)
-        self.tracker.lock.release()
+        order = "most" if sort_by_most_used else "last"
+        try:
+            job = ExportJob(lambda: self.tracker.export_rows(order), filepath).start()
+        except ValueError as e:
+            messagebox.showerror("Export", str(e))
+            return
+        self.export_btn.config(state="disabled")
+        win = tk.Toplevel(self.root)
+        win.title("Exporting")
+        win.resizable(False, False)
+        bar = ttk.Progressbar(win, length=260, mode="indeterminate")
+        bar.pack(padx=10, pady=10)
+        bar.start(10)
+        status = tk.Label(win, text="Starting...")
+        status.pack()
+        tk.Button(win, text="Cancel", command=job.cancel).pack(pady=5)
+        win.protocol("WM_DELETE_WINDOW", job.cancel)
 
-        if sort_by_most_used:
-            order = [k for k, _ in sorted(seconds_map.items(), key=lambda x: -x[1])]
-        else:
-            order = sorted(seconds_map.keys(), key=lambda a: last_used_map.get(a, 0), reverse=True)
-
-        with open(filepath, "w", encoding="utf-8") as f:
-            for app in order:
-                seconds = int(seconds_map.get(app, 0))
-                time_str = time.strftime("%H:%M:%S", time.gmtime(seconds))
-                ts = last_used_map.get(app)
-                if ts:
-                    last_used_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
-                    ago_str = fmt_ago(now, ts)
-                    f.write(f"{app}: {time_str} (Last used: {last_used_str} | {ago_str})\n")
-                else:
-                    f.write(f"{app}: {time_str} (Last used: Never)\n")
+        def poll():
+            if job.total and str(bar.cget("mode")) != "determinate":
+                bar.stop()
+                bar.config(mode="determinate", maximum=job.total)
+            if job.total:
+                bar.config(value=job.done)
+                status.config(text=f"{job.done} / {job.total}")
+            if not job.finished.is_set():
+                self.root.after(100, poll)
+                return
+            win.destroy()
+            self.export_btn.config(state="normal")
+            if job.error:
+                messagebox.showerror("Export", f"Export failed: {job.error}")
+        poll()
 
     def add_whitelist(self):
         file_path = filedialog.askopenfilename(title="Select EXE", filetypes=[("Executables", "*.exe")])
@@ -428,12 +3189,29 @@ class TrackerGUI:
             self.update_whitelist_listbox()
             self.save_settings()
 
+    def add_pattern(self, block):
+        pattern = self.pattern_entry.get().strip()
+        if not pattern:
+            return
+        rules = AppFilter(block=[pattern]) if block else AppFilter([pattern])
+        if rules.errors:
+            messagebox.showerror("Rules", f"Invalid pattern: {rules.errors[0]}")
+            return
+        (self.tracker.blocklist if block else self.tracker.whitelist).add(pattern)
+        self.pattern_entry.delete(0, tk.END)
+        self.update_whitelist_listbox()
+        self.save_settings()
+
     def remove_whitelist(self):
         selected = self.whitelist_listbox.curselection()
         if selected:
             exe_name = self.whitelist_listbox.get(selected[0])
-            if exe_name in self.tracker.whitelist:
-                self.tracker.whitelist.remove(exe_name)
+            rules = self.tracker.whitelist
+            if exe_name.startswith("block: "):
+                exe_name = exe_name[7:]
+                rules = self.tracker.blocklist
+            if exe_name in rules:
+                rules.remove(exe_name)
                 self.update_whitelist_listbox()
                 self.save_settings()
 
@@ -441,13 +3219,15 @@ class TrackerGUI:
         self.whitelist_listbox.delete(0, tk.END)
         for exe in sorted(self.tracker.whitelist):
             self.whitelist_listbox.insert(tk.END, exe)
+        for exe in sorted(self.tracker.blocklist):
+            self.whitelist_listbox.insert(tk.END, f"block: {exe}")
 
     def save_settings(self):
         self.tracker.settings["dark_mode"] = self.var_dark_mode.get()
         self.tracker.settings["start_minimized"] = self.var_start_minimized.get()
         self.tracker.settings["whitelist"] = list(self.tracker.whitelist)
-        self.tracker._dirty_settings = False
-        atomic_write_json(SETTINGS_FILE, self.tracker.settings, SETTINGS_BAK)
+        self.tracker.settings["blocklist"] = list(self.tracker.blocklist)
+        self.tracker.save_settings()
 
     def toggle_dark_mode(self):
         enabled = self.var_dark_mode.get()
@@ -461,6 +3241,9 @@ class TrackerGUI:
         btn_fg = fg
         select_color = "#555555" if enabled else "#f0f0f0"
         self.root.configure(bg=bg)
+        style = ttk.Style(self.root)
+        style.configure("Treeview", background=bg, fieldbackground=bg, foreground=fg)
+        style.configure("Treeview.Heading", background=btn_bg, foreground=fg)
         for widget in self.root.winfo_children():
             cls = widget.__class__.__name__
             if cls == "Frame":
@@ -503,15 +3286,13 @@ class TrackerGUI:
         set_startup(enable, user=False)
 
     def get_tray_title(self):
-        current_app = self.tracker.current_app or "No active window"
+        current_app = self.tracker.snapshot.current_app or "No active window"
         return f"Tracking: {current_app}"
 
     def minimize_to_tray(self):
         self.root.withdraw()
         if not self.is_tray_active:
-            if not ICON_PATH.exists():
-                return
-            image = Image.open(str(ICON_PATH)).resize((64, 64), Image.LANCZOS)
+            image = get_tray_image()
             menu = self.build_tray_menu()
             self.tray_icon = pystray.Icon("AllSeeingEye", image, self.get_tray_title(), menu)
             self.tray_icon.run_detached()
@@ -550,15 +3331,1140 @@ class TrackerGUI:
     def run(self):
         self.root.mainloop()
 
-def get_active_app():
+class QueryAPI:
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self._index_lock = threading.Lock()
+        self._index_version = None
+        self._totals = {}
+        self._last_used = {}
+        self._by_total = []
+        self._by_last_used = []
+
+    def _index(self):
+        version = self.tracker.snapshot.version
+        with self._index_lock:
+            if version != self._index_version:
+                with self.tracker.lock:
+                    totals = dict(self.tracker.data)
+                    last_used = dict(self.tracker.last_used)
+                self._by_total = sorted(totals, key=lambda a: -totals[a])
+                self._by_last_used = sorted(last_used, key=lambda a: -last_used[a])
+                self._totals = totals
+                self._last_used = last_used
+                self._index_version = version
+            return self._totals, self._last_used, self._by_total, self._by_last_used
+
+    def snapshot(self, version=None, timeout=0):
+        if version is not None and timeout:
+            snap = self.tracker.wait_for_change(int(version), min(float(timeout), API_MAX_WAIT))
+        else:
+            snap = self.tracker.snapshot
+        return {"version": snap.version, "current_app": snap.current_app, "start_time": snap.start_time, "recent": snap.recent}
+
+    def current(self):
+        snap = self.tracker.snapshot
+        return {"version": snap.version, "app": snap.current_app, "since": snap.start_time}
+
+    def top(self, n=10, start=None, end=None):
+        n = int(n)
+        if start is None and end is None:
+            totals, _, by_total, _ = self._index()
+            return [[app, totals[app]] for app in by_total[:n]]
+        start = parse_export_time(start) or 0
+        end = parse_export_time(end) or self.tracker.source.now()
+        totals = self.tracker.range_totals(start, end)
+        return sorted(([app, secs] for app, secs in totals.items()), key=lambda r: -r[1])[:n]
+
+    def last_used(self, n=10, app=None):
+        _, last_used, _, by_last_used = self._index()
+        if app is not None:
+            return {"app": app, "last_used": last_used.get(app)}
+        return [[a, last_used[a]] for a in by_last_used[:int(n)]]
+
+    def totals(self, app=None):
+        totals = self._index()[0]
+        if app is not None:
+            return {"app": app, "seconds": totals.get(app, 0)}
+        return totals
+
+    def retention(self):
+        return self.tracker.retention_stats
+
+    def stop(self, update=None):
+        if update is None:
+            raise ValueError("POST required")
+        self.tracker.running = False
+        return {"stopping": True}
+
+    def changes(self, since=None):
+        return self.tracker.changes_since(None if since is None else int(since))
+
+    def at(self, t=None):
+        ts = parse_export_time(t) or self.tracker.source.now()
+        found = self.tracker.app_at(ts)
+        if found is None:
+            return {"t": ts, "app": None}
+        app, start, end = found
+        return {"t": ts, "app": app, "start": start, "end": end}
+
+    def sessions(self, start=None, end=None, app=None, limit=1000):
+        start = parse_export_time(start)
+        end = parse_export_time(end)
+        if self.tracker.intervals is None:
+            raise ValueError("sessions need \"segment_history\" or \"history_db\" in settings.json")
+        if app is not None:
+            return {"app": app, "seconds": self.tracker.intervals.app_time(app, start, end)}
+        limit = int(limit)
+        rows = []
+        cold = self.tracker.cold
+        if cold is not None and (start is None or start < cold.sealed_until):
+            for row in cold.intervals(start, end):
+                if len(rows) >= limit:
+                    break
+                rows.append(list(row))
+        return rows + [list(row) for row in self.tracker.intervals.overlapping(start, end, limit - len(rows))]
+
+    def metrics(self):
+        if self.tracker.metrics is None:
+            raise ValueError("metrics are disabled; set \"metrics\": 1 in settings.json")
+        return self.tracker.metrics.render()
+
+    def titles(self, app=None, n=10):
+        titles = self.tracker.titles
+        if titles is None:
+            return []
+        with self.tracker.lock:
+            rows = titles.rows(app)[:]
+        top = titles.rank(rows, int(n))
+        with self.tracker.lock:
+            return [list(row) for row in titles.describe(top)]
+
+    def export(self, order="most"):
+        rows, _ = self.tracker.export_rows(order)
+        return [list(row) for row in rows]
+
+    def settings(self, update=None):
+        if update:
+            for key in ("dark_mode", "start_minimized", "app_groups"):
+                if key in update:
+                    self.tracker.settings[key] = update[key]
+            for key in ("whitelist", "blocklist"):
+                if key in update:
+                    setattr(self.tracker, key, set(update[key]))
+                    self.tracker.settings[key] = list(update[key])
+            self.tracker.save_settings()
+        return self.tracker.settings
+
+class QueryHandler:
+    routes = {
+        "/snapshot": "snapshot",
+        "/current": "current",
+        "/top": "top",
+        "/last_used": "last_used",
+        "/totals": "totals",
+        "/titles": "titles",
+        "/retention": "retention",
+        "/metrics": "metrics",
+        "/changes": "changes",
+        "/stop": "stop",
+        "/at": "at",
+        "/sessions": "sessions",
+        "/export": "export",
+        "/settings": "settings",
+    }
+
+    def _reply(self, status, body):
+        if isinstance(body, str):
+            payload = body.encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        else:
+            payload = json.dumps(body, separators=(",", ":")).encode("utf-8")
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _host_allowed(self):
+        host = self.headers.get("Host", "")
+        if ":" in host:
+            host = host.rsplit(":", 1)[0]
+        return host.lower() in API_HOSTS
+
+    def _token_ok(self):
+        import hmac
+        return hmac.compare_digest(self.headers.get(API_TOKEN_HEADER, "").encode("utf-8"), self.server.token.encode("utf-8"))
+
+    def _dispatch(self, extra=None):
+        import urllib.parse
+        url = urllib.parse.urlsplit(self.path)
+        name = self.routes.get(url.path)
+        if name is None:
+            self._reply(404, {"error": "not found"})
+            return
+        params = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        if "from" in params:
+            params["start"] = params.pop("from")
+        if "to" in params:
+            params["end"] = params.pop("to")
+        if extra is not None:
+            params["update"] = extra
+        try:
+            self._reply(200, getattr(self.server.api, name)(**params))
+        except (TypeError, ValueError) as e:
+            self._reply(400, {"error": str(e)})
+
+    def do_GET(self):
+        if not self._host_allowed():
+            self._reply(403, {"error": "forbidden host"})
+            return
+        if not self._token_ok():
+            self._reply(403, {"error": "bad token"})
+            return
+        self._dispatch()
+
+    def do_POST(self):
+        if not self._host_allowed():
+            self._reply(403, {"error": "forbidden host"})
+            return
+        if self.headers.get_content_type() != "application/json":
+            self._reply(415, {"error": "application/json required"})
+            return
+        if not self._token_ok():
+            self._reply(403, {"error": "bad token"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._reply(400, {"error": str(e)})
+            return
+        self._dispatch(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def load_api_token(base=APPDATA_DIR, create=False):
+    path = data_path(base, API_TOKEN_FILE)
     try:
-        hwnd = win32gui.GetForegroundWindow()
+        token = path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        if not create:
+            raise
+        token = ""
+    if token or not create:
+        return token
+    import secrets
+    token = secrets.token_urlsafe(32)
+    tmp_path = path.with_suffix(".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return token
+
+def start_query_server(tracker, port=API_PORT):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    handler = type("QueryRequestHandler", (QueryHandler, BaseHTTPRequestHandler), {})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.api = QueryAPI(tracker)
+    server.token = load_api_token(tracker.data_dir, create=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class TrackerClient:
+    def __init__(self, port=API_PORT):
+        self.base = f"http://127.0.0.1:{port}"
+        self.token = load_api_token()
+        self.settings = self._call("/settings")
+        self.whitelist = set(self.settings.get("whitelist", []))
+        self.blocklist = set(self.settings.get("blocklist", []))
+        self._snapshot = None
+
+    def _call(self, path, body=None, timeout=5):
+        import urllib.request
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        req = urllib.request.Request(self.base + path, data=data, headers={"Content-Type": "application/json", API_TOKEN_HEADER: self.token})
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read())
+
+    @property
+    def snapshot(self):
+        try:
+            snap = self._call("/snapshot")
+            self._snapshot = TrackerSnapshot(snap["version"], snap["current_app"], snap["start_time"], tuple(tuple(r) for r in snap["recent"]))
+        except OSError:
+            if self._snapshot is None:
+                self._snapshot = TrackerSnapshot(-1, None, 0.0, ())
+        return self._snapshot
+
+    def wait_for_change(self, version, timeout=API_MAX_WAIT):
+        snap = self._call(f"/snapshot?version={version}&timeout={timeout}", timeout=timeout + 5)
+        self._snapshot = TrackerSnapshot(snap["version"], snap["current_app"], snap["start_time"], tuple(tuple(r) for r in snap["recent"]))
+        return self._snapshot
+
+    def recent_rows(self, n=3):
+        return list((self._snapshot or self.snapshot).recent[:n])
+
+    def export_rows(self, order="most"):
+        rows = self._call(f"/export?order={order}", timeout=120)
+        return (tuple(r) for r in rows), len(rows)
+
+    def changes_since(self, version=None):
+        return self._call("/changes" if version is None else f"/changes?since={version}", timeout=30)
+
+    def top(self, n=10, start=None, end=None):
+        import urllib.parse
+        query = {"n": n}
+        if start is not None:
+            query["from"] = start
+        if end is not None:
+            query["to"] = end
+        return self._call("/top?" + urllib.parse.urlencode(query))
+
+    def save_settings(self):
+        self.settings["whitelist"] = list(self.whitelist)
+        self.settings["blocklist"] = list(self.blocklist)
+        self.settings = self._call("/settings", self.settings)
+
+    def stop(self):
+        pass
+
+def shared_state_name():
+    uid = os.getuid() if hasattr(os, "getuid") else os.getenv("USERNAME", "")
+    return f"AllSeeingEye-state-{uid}"
+
+def shared_layout(capacity, names_capacity):
+    offsets = {}
+    pos = struct.calcsize(SHARED_HEADER)
+    for key, size in (
+        ("totals", 8 * capacity), ("last", 8 * capacity), ("today", 8 * capacity),
+        ("changes", 4 * CHANGE_LOG_SIZE), ("name_offsets", 4 * (capacity + 1)), ("names", names_capacity),
+    ):
+        pos += -pos % 8
+        offsets[key] = pos
+        pos += size
+    return offsets, pos
+
+def _map_shared(name, size):
+    import mmap
+    if sys.platform == "win32":
+        return mmap.mmap(-1, size, tagname=name, access=mmap.ACCESS_READ)
+    with open(f"/dev/shm/{name}", "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class SharedStatePublisher:
+    def __init__(self, name=None):
+        self.name = name or shared_state_name()
+        self.control = self._create(self.name, struct.calcsize(SHARED_CONTROL))
+        self.generation = 0
+        self.block = None
+        self.rows = {}
+        self.names_used = 0
+        self.capacity = self.names_capacity = 0
+        self.epoch = 0
+        self.changes = 0
+        self.seq = 0
+        self.day = None
+
+    def _create(self, name, size):
+        from multiprocessing import shared_memory
+        try:
+            return shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            return shared_memory.SharedMemory(name, create=True, size=size)
+
+    def _write_row(self, row, total, last, today):
+        buf = self.block.buf
+        struct.pack_into("<d", buf, self.offsets["totals"] + 8 * row, -1.0 if total is None else total)
+        struct.pack_into("<d", buf, self.offsets["last"] + 8 * row, last or 0.0)
+        struct.pack_into("<d", buf, self.offsets["today"] + 8 * row, today)
+
+    def _add_name(self, app):
+        name = app.encode("utf-8")
+        row = len(self.rows)
+        if row >= self.capacity or self.names_used + len(name) > self.names_capacity:
+            return None
+        buf = self.block.buf
+        start = self.offsets["names"] + self.names_used
+        buf[start:start + len(name)] = name
+        self.names_used += len(name)
+        struct.pack_into("<I", buf, self.offsets["name_offsets"] + 4 * (row + 1), self.names_used)
+        self.rows[app] = row
+        return row
+
+    def _write_header(self, tracker):
+        recent = [self.rows.get(app, -1) for app in tracker.recent_apps[:3]]
+        recent += [-1] * (3 - len(recent))
+        current = self.rows.get(tracker.current_app, -1) if tracker.current_app else -1
+        struct.pack_into(
+            SHARED_HEADER, self.block.buf, 0, self.seq, tracker.version, self.changes, self.epoch,
+            tracker.start_time, os.getpid(), len(self.rows), self.capacity, self.names_used, self.names_capacity,
+            current, *recent, self.day.encode("ascii"),
+        )
+
+    def rebuild(self, tracker):
+        apps = list(tracker.data)
+        if tracker.current_app and tracker.current_app not in tracker.data:
+            apps.append(tracker.current_app)
+        names_size = sum(len(app.encode("utf-8")) for app in apps)
+        self.capacity = max(SHARED_MIN_ROWS, 2 * len(apps))
+        self.names_capacity = max(32 * SHARED_MIN_ROWS, 2 * names_size)
+        self.offsets, size = shared_layout(self.capacity, self.names_capacity)
+        old = self.block
+        self.generation += 1
+        self.block = self._create(f"{self.name}-{self.generation}", size)
+        self.rows = {}
+        self.names_used = 0
+        self.day = rollup_label("day", tracker.source.now())
+        today = tracker.rollups.buckets["day"].get(self.day, {})
+        for app in apps:
+            row = self._add_name(app)
+            self._write_row(row, tracker.data.get(app), tracker.last_used.get(app), today.get(app, 0.0))
+        self.epoch = (os.getpid() << 32) | self.generation
+        self.changes = 0
+        self.seq = 0
+        self._write_header(tracker)
+        struct.pack_into(SHARED_CONTROL, self.control.buf, 0, SHARED_MAGIC, SHARED_VERSION, 0, self.generation, size)
+        if old is not None:
+            old.close()
+            old.unlink()
+
+    def publish(self, tracker, touched):
+        if self.block is None or rollup_label("day", tracker.source.now()) != self.day:
+            self.rebuild(tracker)
+            return
+        buf = self.block.buf
+        self.seq += 1
+        struct.pack_into("<Q", buf, 0, self.seq)
+        today = tracker.rollups.buckets["day"].get(self.day, {})
+        apps = set(touched)
+        if tracker.current_app:
+            apps.add(tracker.current_app)
+        for app in apps:
+            row = self.rows.get(app)
+            if row is None:
+                row = self._add_name(app)
+                if row is None:
+                    self.seq += 1
+                    self.rebuild(tracker)
+                    return
+            elif app not in touched:
+                continue
+            self._write_row(row, tracker.data.get(app), tracker.last_used.get(app), today.get(app, 0.0))
+            struct.pack_into("<I", buf, self.offsets["changes"] + 4 * (self.changes % CHANGE_LOG_SIZE), row)
+            self.changes += 1
+        self._write_header(tracker)
+        self.seq += 1
+        struct.pack_into("<Q", buf, 0, self.seq)
+
+    def close(self):
+        for shm in (self.block, self.control):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self.block = None
+
+class SharedStateReader:
+    def __init__(self, name=None):
+        self.name = name or shared_state_name()
+        self.control = _map_shared(self.name, struct.calcsize(SHARED_CONTROL))
+        self.generation = None
+        self.block = None
+        self._names = []
+        self._attach()
+
+    def _attach(self):
+        magic, _, _, generation, size = struct.unpack_from(SHARED_CONTROL, self.control, 0)
+        if magic != SHARED_MAGIC:
+            raise FileNotFoundError(f"no tracker state published under {self.name}")
+        if generation != self.generation:
+            block = _map_shared(f"{self.name}-{generation}", size)
+            if self.block is not None:
+                self.block.close()
+            self.block = block
+            self.generation = generation
+            self._names = []
+            self._layout = None
+
+    def _read(self, fn):
+        for _ in range(SHARED_READ_RETRIES):
+            self._attach()
+            header = struct.unpack_from(SHARED_HEADER, self.block, 0)
+            if header[0] & 1:
+                time.sleep(0)
+                continue
+            known = len(self._names)
+            try:
+                result = fn(header)
+            except (ValueError, IndexError, struct.error):
+                result = None
+            if result is not None and struct.unpack_from("<Q", self.block, 0)[0] == header[0]:
+                return result
+            del self._names[known:]
+            time.sleep(0)
+        raise BlockingIOError("tracker state kept changing while being read")
+
+    def _offsets(self, header):
+        if self._layout is None or self._layout[0] != header[7:10:2]:
+            self._layout = (header[7:10:2], shared_layout(header[7], header[9])[0])
+        return self._layout[1]
+
+    def _name(self, offsets, row):
+        names = self._names
+        if row >= len(names):
+            ends = memoryview(self.block)[offsets["name_offsets"]:offsets["name_offsets"] + 4 * (row + 2)].cast("I")
+            blob = memoryview(self.block)[offsets["names"]:]
+            try:
+                for i in range(len(names), row + 1):
+                    names.append(str(blob[ends[i]:ends[i + 1]], "utf-8"))
+            finally:
+                ends.release()
+                blob.release()
+        return names[row]
+
+    def _column(self, offsets, key, n):
+        view = memoryview(self.block)[offsets[key]:offsets[key] + 8 * n].cast("d")
+        try:
+            return view.tolist()
+        finally:
+            view.release()
+
+    def _row(self, offsets, row):
+        total, = struct.unpack_from("<d", self.block, offsets["totals"] + 8 * row)
+        last, = struct.unpack_from("<d", self.block, offsets["last"] + 8 * row)
+        today, = struct.unpack_from("<d", self.block, offsets["today"] + 8 * row)
+        return [self._name(offsets, row), None if total < 0 else total, last or None, today]
+
+    def pid(self):
+        return self._read(lambda header: header[5])
+
+    def snapshot(self):
+        def read(header):
+            offsets = self._offsets(header)
+            current = self._name(offsets, header[10]) if header[10] >= 0 else None
+            recent = tuple(tuple(self._row(offsets, row)[:3]) for row in header[11:14] if row >= 0)
+            return TrackerSnapshot(header[1], current, header[4], recent)
+        return self._read(read)
+
+    def changes_since(self, version=None):
+        def read(header):
+            offsets = self._offsets(header)
+            changes, epoch, n = header[2], header[3], header[6]
+            if version is None or version[0] != epoch or not 0 <= changes - version[1] <= CHANGE_LOG_SIZE:
+                totals, last, today = (self._column(offsets, key, n) for key in ("totals", "last", "today"))
+                if n:
+                    self._name(offsets, n - 1)
+                names = self._names
+                rows = [[names[i], None if totals[i] < 0 else totals[i], last[i] or None, today[i]] for i in range(n)]
+                full = True
+            else:
+                touched = {struct.unpack_from("<I", self.block, offsets["changes"] + 4 * (i % CHANGE_LOG_SIZE))[0] for i in range(version[1], changes)}
+                rows = [self._row(offsets, row) for row in touched]
+                full = False
+            return {"version": (epoch, changes), "day": header[14].decode("ascii"), "full": full, "rows": rows}
+        return self._read(read)
+
+    def close(self):
+        for mm in (self.block, self.control):
+            if mm is not None:
+                mm.close()
+
+def spawn_tracker(port=None):
+    import subprocess
+    exe, script = _get_startup_command_parts()
+    args = [exe] + ([script.strip('"')] if script else []) + ["--daemon", "--shared"]
+    if port:
+        args.append(f"--api-port={port}")
+    kwargs = {"start_new_session": True}
+    if sys.platform == "win32":
+        kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS}
+    return subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, close_fds=True, **kwargs)
+
+class SharedTrackerClient(TrackerClient):
+    def __init__(self, port=API_PORT):
+        self.port = port
+        self._respawn = None
+        self._attached = None
+        self.state = self._attach()
+        self._checked = time.time()
+
+    def _attach(self):
+        deadline = time.time() + SHARED_ATTACH_TIMEOUT
+        while True:
+            try:
+                TrackerClient.__init__(self, self.port)
+                return SharedStateReader()
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    def _restart(self):
+        try:
+            spawn_tracker(self.port)
+            self._attached = self._attach()
+        except OSError:
+            pass
+        finally:
+            self._checked = time.time()
+            self._respawn = None
+
+    def _check(self):
+        if self._respawn is not None:
+            return
+        if self._attached is not None:
+            self.state.close()
+            self.state, self._attached = self._attached, None
+        if time.time() - self._checked < SHARED_CHECK_INTERVAL:
+            return
+        self._checked = time.time()
+        import psutil
+        if not psutil.pid_exists(self.state.pid()):
+            self._respawn = threading.Thread(target=self._restart, daemon=True)
+            self._respawn.start()
+
+    @property
+    def snapshot(self):
+        try:
+            self._check()
+            self._snapshot = self.state.snapshot()
+        except OSError:
+            if self._snapshot is None:
+                self._snapshot = TrackerSnapshot(-1, None, 0.0, ())
+        return self._snapshot
+
+    def changes_since(self, version=None):
+        return self.state.changes_since(version)
+
+    def stop(self):
+        try:
+            self._call("/stop", {})
+        except OSError:
+            pass
+
+class ProcessIndex:
+    def __init__(self, groups=None):
+        self.groups = [(group, AppFilter(patterns)) for group, patterns in (groups or {}).items()]
+        self._procs = {}
+        self._group_of = {}
+        self.refreshes = 0
+        self.added = 0
+        self.removed = 0
+
+    def _add(self, pid):
+        import psutil
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                entry = (process.ppid(), process.create_time(), process.name())
+        except psutil.Error:
+            self._procs.pop(pid, None)
+            return None
+        self._procs[pid] = entry
+        self.added += 1
+        return entry
+
+    def refresh(self, pids=None):
+        if pids is None:
+            import psutil
+            pids = set(psutil.pids())
+        for pid in self._procs.keys() - pids:
+            del self._procs[pid]
+            self.removed += 1
+        for pid in pids - self._procs.keys():
+            self._add(pid)
+        self.refreshes += 1
+
+    def entry(self, pid, create_time=None):
+        entry = self._procs.get(pid)
+        if entry is None or (create_time is not None and entry[1] != create_time):
+            entry = self._add(pid)
+        return entry
+
+    def ancestors(self, pid, create_time=None):
+        chain = []
+        seen = set()
+        entry = self.entry(pid, create_time)
+        while entry is not None and pid not in seen:
+            seen.add(pid)
+            chain.append((pid, entry[2]))
+            ppid = entry[0]
+            if not ppid or ppid == pid:
+                break
+            parent = self._procs.get(ppid) or self._add(ppid)
+            if parent is None or parent[1] > entry[1]:
+                break
+            pid, entry = ppid, parent
+        return chain
+
+    def group_name(self, name):
+        group = self._group_of.get(name)
+        if group is None:
+            group = ""
+            for candidate, patterns in self.groups:
+                if patterns.decide(name):
+                    group = candidate
+                    break
+            self._group_of[name] = group
+        return group
+
+    def group(self, pid, create_time=None, name=None):
+        chain = self.ancestors(pid, create_time)
+        for _, ancestor in chain:
+            group = self.group_name(ancestor)
+            if group:
+                return group
+        if name is None and chain:
+            name = chain[0][1]
+        return name
+
+    def stats(self):
+        return {"size": len(self._procs), "refreshes": self.refreshes, "added": self.added, "removed": self.removed, "groups": len(self.groups)}
+
+class ProcessNameCache:
+    def __init__(self, maxsize=PROCESS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._names = OrderedDict()
+        self._paths = {}
+        self.index = None
+        self._hwnd = None
+        self._hwnd_key = None
+        self._hwnd_checked = 0.0
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.hwnd_hits = 0
+        self.evictions = 0
+
+    def resolve(self, hwnd):
+        now = time.monotonic()
+        key = self._hwnd_key
+        if hwnd == self._hwnd and key in self._names and now - self._hwnd_checked < PROCESS_REVALIDATE:
+            self.hwnd_hits += 1
+            self.hits += 1
+            return self._names[key]
+        import psutil
+        import win32process
         _, pid = win32process.GetWindowThreadProcessId(hwnd)
-        process = psutil.Process(pid)
-        return process.name()
+        try:
+            process = psutil.Process(pid)
+            key = (pid, process.create_time())
+        except psutil.NoSuchProcess:
+            self.evict_pid(pid)
+            raise
+        self._hwnd = hwnd
+        self._hwnd_key = key
+        self._hwnd_checked = now
+        name = self._names.get(key)
+        if name is not None:
+            self.hits += 1
+            self._names.move_to_end(key)
+            return name
+        self.misses += 1
+        self.evict_pid(pid)
+        name = process.name()
+        if self.index is not None:
+            name = self.index.group(pid, key[1], name)
+        self._names[key] = name
+        try:
+            self._paths[key] = process.exe()
+        except Exception:
+            self._paths[key] = None
+        if len(self._names) > self.maxsize:
+            old, _ = self._names.popitem(last=False)
+            self._paths.pop(old, None)
+            self.evictions += 1
+        if now - self._last_sweep >= PROCESS_SWEEP_INTERVAL:
+            self.sweep()
+        return name
+
+    def path(self, app):
+        key = self._hwnd_key
+        if key is None or self._names.get(key) != app:
+            return None
+        return self._paths.get(key)
+
+    def evict_pid(self, pid):
+        for key in [k for k in self._names if k[0] == pid]:
+            del self._names[key]
+            self._paths.pop(key, None)
+            self.evictions += 1
+
+    def sweep(self):
+        self._last_sweep = time.monotonic()
+        import psutil
+        alive = set(psutil.pids())
+        for key in [k for k in self._names if k[0] not in alive]:
+            del self._names[key]
+            self._paths.pop(key, None)
+            self.evictions += 1
+        if self.index is not None:
+            self.index.refresh(alive)
+
+    def set_index(self, index):
+        self.index = index
+        self._names.clear()
+        self._paths.clear()
+        self._hwnd_key = None
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hwnd_hits": self.hwnd_hits,
+            "evictions": self.evictions,
+            "size": len(self._names),
+        }
+
+_process_cache = ProcessNameCache()
+
+def get_active_app():
+    try:
+        import win32gui
+        return _process_cache.resolve(win32gui.GetForegroundWindow())
+    except Exception:
+        return None
+
+def get_active_title():
+    try:
+        import win32gui
+        return win32gui.GetWindowText(win32gui.GetForegroundWindow())
     except Exception:
         return None
 
+class LASTINPUTINFO(ctypes.Structure):
+    _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+
+def get_idle_duration():
+    lii = LASTINPUTINFO()
+    lii.cbSize = ctypes.sizeof(LASTINPUTINFO)
+    ctypes.windll.user32.GetLastInputInfo(ctypes.byref(lii))
+    millis = ctypes.windll.kernel32.GetTickCount() - lii.dwTime
+    return millis / 1000.0
+
+class ActivitySource:
+    mode = "poll"
+    finished = False
+
+    def now(self):
+        return time.time()
+
+    def active_app(self):
+        return None
+
+    def app_path(self, app):
+        return None
+
+    def active_title(self):
+        return None
+
+    def idle_seconds(self):
+        return 0.0
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+class Win32PollSource(ActivitySource):
+    def active_app(self):
+        return get_active_app()
+
+    def app_path(self, app):
+        return _process_cache.path(app)
+
+    def active_title(self):
+        return get_active_title()
+
+    def idle_seconds(self):
+        return get_idle_duration()
+
+class Win32EventSource(Win32PollSource):
+    mode = "push"
+
+    def __init__(self):
+        self._events = queue.Queue()
+        self._app = None
+        self._thread_id = None
+        self._proc = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._hook_loop, daemon=True).start()
+        self._ready.wait(5)
+
+    def _hook_loop(self):
+        import ctypes.wintypes as wt
+        user32 = ctypes.windll.user32
+        proto = ctypes.WINFUNCTYPE(None, wt.HANDLE, wt.DWORD, wt.HWND, wt.LONG, wt.LONG, wt.DWORD, wt.DWORD)
+        def on_event(hook, event, hwnd, id_object, id_child, thread_id, ms_time):
+            self._events.put((hwnd, ms_time))
+        self._proc = proto(on_event)
+        user32.SetWinEventHook.restype = wt.HANDLE
+        user32.SetWinEventHook.argtypes = [wt.DWORD, wt.DWORD, wt.HMODULE, proto, wt.DWORD, wt.DWORD, wt.DWORD]
+        hook = user32.SetWinEventHook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, None, self._proc, 0, 0, WINEVENT_OUTOFCONTEXT)
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        self._ready.set()
+        msg = wt.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        if hook:
+            user32.UnhookWinEvent(hook)
+
+    def active_app(self):
+        if self._app is None:
+            self._app = get_active_app()
+        return self._app
+
+    def wait(self, timeout):
+        try:
+            hwnd, ms_time = self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        lag = ((ctypes.windll.kernel32.GetTickCount() - ms_time) & 0xFFFFFFFF) / 1000.0
+        try:
+            app = _process_cache.resolve(hwnd)
+        except Exception:
+            return None
+        self._app = app
+        return time.time() - lag, app
+
+    def close(self):
+        if self._thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+
+class ReplaySource(ActivitySource):
+    def __init__(self, path, mode="push"):
+        self.mode = mode
+        self._events = []
+        self.paths = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                ev = json.loads(line)
+                self._events.append((float(ev["t"]), ev.get("app"), ev.get("idle"), ev.get("title")))
+                if ev.get("app") and ev.get("path"):
+                    self.paths[ev["app"]] = ev["path"]
+        self._events.sort(key=lambda e: e[0])
+        self._i = 0
+        self._end = self._events[-1][0] if self._events else 0.0
+        self.clock = self._events[0][0] if self._events else 0.0
+        self._app = None
+        self._title = None
+        self._idle_since = None
+        self._advance(self.clock)
+
+    @property
+    def finished(self):
+        return self._i >= len(self._events) and self.clock >= self._end
+
+    def _apply(self, t, app, idle, title):
+        if app is not None:
+            self._app = app or None
+            self._title = title
+            self._idle_since = None
+        elif title is not None:
+            self._title = title
+        if idle is not None:
+            self._idle_since = t if idle else None
+
+    def _advance(self, until):
+        while self._i < len(self._events) and self._events[self._i][0] <= until:
+            self._apply(*self._events[self._i])
+            self._i += 1
+        self.clock = max(self.clock, min(until, self._end))
+
+    def now(self):
+        return self.clock
+
+    def active_app(self):
+        return self._app
+
+    def app_path(self, app):
+        return self.paths.get(app)
+
+    def active_title(self):
+        return self._title
+
+    def idle_seconds(self):
+        if self._idle_since is None:
+            return 0.0
+        return self.clock - self._idle_since
+
+    def wait(self, timeout):
+        deadline = self.clock + timeout
+        if self.mode == "push":
+            while self._i < len(self._events) and self._events[self._i][0] <= deadline:
+                t, app, idle, title = self._events[self._i]
+                self._i += 1
+                self._apply(t, app, idle, title)
+                self.clock = max(self.clock, t)
+                if app:
+                    return t, app
+                if title is not None and self._app:
+                    return t, self._app
+        self._advance(deadline)
+        return None
+
+def run_replay(path, mode="push", data_dir=None):
+    import tempfile
+    tracker = AppTracker(ReplaySource(path, mode), data_dir or tempfile.mkdtemp(prefix="allseeingeye-"))
+    tracker.track_loop()
+    tracker.stop()
+    return tracker
+
+def run_replay_arg_if_present():
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    if "replay" in opts:
+        tracker = run_replay(opts["replay"], opts.get("replay-mode", "push"), opts.get("data-dir"))
+        totals = sorted(tracker.data.items(), key=lambda x: -x[1])
+        result = {
+            "data_dir": str(tracker.data_dir),
+            "wakeups_per_hour": round(tracker.scheduler.wakeups_per_hour(), 1),
+            "totals": dict(totals),
+        }
+        print(json.dumps(result, indent=2))
+        sys.exit(0)
+
+def parse_export_time(value):
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+def run_export_arg_if_present():
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    if "export" not in opts:
+        return
+    base = Path(opts.get("data-dir") or APPDATA_DIR)
+    data, last_used, rollups, _ = load_state_with_journal(base, compact=False)
+    settings = load_json_with_backup(data_path(base, SETTINGS_FILE), data_path(base, SETTINGS_BAK))
+    history = segments = None
+    if settings.get("history_db", 0) and data_path(base, HISTORY_DB).exists():
+        history = HistoryStore(data_path(base, HISTORY_DB))
+    if settings.get("segment_history", 0) and data_path(base, SEGMENTS_DIR).exists():
+        segments = SegmentStore(data_path(base, SEGMENTS_DIR))
+    cold = None
+    if data_path(base, COLD_DIR).exists():
+        cold = ColdStore(data_path(base, COLD_DIR), settings.get("cold_codec", "lzma"))
+    start_ts = parse_export_time(opts.get("export-from"))
+    end_ts = parse_export_time(opts.get("export-to"))
+    if start_ts is not None or end_ts is not None:
+        raw_floor = retention_cutoff(settings, "retention_raw_days", time.time())
+        data = range_totals(rollups, history, start_ts or 0, end_ts or time.time(), segments, raw_floor, cold)
+    else:
+        for app, (total, last) in load_json_with_backup(data_path(base, ARCHIVE_FILE), data_path(base, ARCHIVE_BAK)).items():
+            data.setdefault(app, total)
+            last_used.setdefault(app, last)
+    week = rollups.bucket("week")
+    order = opts.get("export-order", "most")
+    try:
+        job = ExportJob(lambda: export_rows(data, last_used, week, order), opts["export"], opts.get("export-format"))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    job.run()
+    if job.error:
+        print(f"Export failed: {job.error}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Exported {job.done} apps to {job.path}")
+    sys.exit(0)
+
+def run_fleet_arg_if_present():
+    import glob
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    if "fleet-dir" not in opts:
+        return
+    store = FleetStore(opts["fleet-dir"], int(opts["fleet-workers"]) if opts.get("fleet-workers") else None)
+    if opts.get("fleet-ingest"):
+        paths = [p for pattern in opts["fleet-ingest"].split(os.pathsep) for p in sorted(glob.glob(pattern))]
+        t0 = time.perf_counter()
+        stats = store.ingest(paths)
+        for error in stats["errors"]:
+            print(error, file=sys.stderr)
+        print(f"Ingested {stats['files']} files from {stats['machines']} machines ({stats['rows']} app rows) in {time.perf_counter() - t0:.2f}s")
+    if opts.get("fleet-export"):
+        order = opts.get("export-order", "most")
+        try:
+            job = ExportJob(lambda: store.export_rows(order), opts["fleet-export"], opts.get("export-format"))
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(2)
+        job.run()
+        if job.error:
+            print(f"Export failed: {job.error}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Exported {job.done} apps from {len(store.runs())} machines to {job.path}")
+    sys.exit(0)
+
+def start_tracking(startup):
+    _mutex = ensure_single_instance()
+    startup.mark("single_instance")
+    tracker = AppTracker()
+    startup.mark("load_state")
+    tracker.start()
+    tracker.first_tick.wait(1.0)
+    startup.mark("first_tick")
+    return tracker, _mutex
+
+def run_daemon(startup, port=None, shared=False):
+    tracker, _mutex = start_tracking(startup)
+    if shared or tracker.settings.get("split_process", 0):
+        with tracker.lock:
+            tracker.shared = SharedStatePublisher()
+            tracker.shared.rebuild(tracker)
+        startup.mark("shared_state")
+    server = start_query_server(tracker, port or tracker.settings.get("api_port", API_PORT))
+    startup.mark("query_server")
+    startup.write(STARTUP_LOG)
+    try:
+        while tracker.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        tracker.stop()
+
+def tracker_process_running():
+    try:
+        state = SharedStateReader()
+    except (OSError, ValueError):
+        return False
+    try:
+        import psutil
+        return psutil.pid_exists(state.pid())
+    except OSError:
+        return False
+    finally:
+        state.close()
+
+def run_split_gui(startup, port=None):
+    _mutex = ensure_single_instance("gui")
+    settings = load_json_with_backup(SETTINGS_FILE, SETTINGS_BAK)
+    port = port or settings.get("api_port", API_PORT)
+    if not tracker_process_running():
+        spawn_tracker(port)
+    startup.mark("spawn_tracker")
+    gui = TrackerGUI(SharedTrackerClient(port))
+    startup.mark("gui")
+    startup.write(STARTUP_LOG)
+    gui.run()
+
 def apply_startup_task_arg_if_present():
     for a in sys.argv[1:]:
         if a.startswith("--apply-startup="):
@@ -570,9 +4476,33 @@ def apply_startup_task_arg_if_present():
             sys.exit(0)
 
 if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    startup = StartupTimer(_STARTUP_T0)
+    startup.mark("imports")
     apply_startup_task_arg_if_present()
-    _mutex = ensure_single_instance()
-    tracker = AppTracker()
-    tracker.start()
+    run_replay_arg_if_present()
+    run_export_arg_if_present()
+    run_fleet_arg_if_present()
+    opts = dict(a[2:].split("=", 1) if "=" in a else (a[2:], "") for a in sys.argv[1:] if a.startswith("--"))
+    startup.mark("args")
+    if "daemon" in opts:
+        run_daemon(startup, int(opts["api-port"]) if opts.get("api-port") else None, "shared" in opts)
+        sys.exit(0)
+    if "split" in opts or load_json_with_backup(SETTINGS_FILE, SETTINGS_BAK).get("split_process", 0):
+        run_split_gui(startup, int(opts["api-port"]) if opts.get("api-port") else None)
+        sys.exit(0)
+    if "attach" in opts:
+        gui = TrackerGUI(TrackerClient(int(opts.get("api-port") or API_PORT)))
+        gui.run()
+        sys.exit(0)
+    tracker, _mutex = start_tracking(startup)
+    if tracker.settings.get("api_server", 0):
+        start_query_server(tracker, tracker.settings.get("api_port", API_PORT))
     gui = TrackerGUI(tracker)
+    startup.mark("gui")
+    startup.write(STARTUP_LOG)
+    if "startup-profile" in opts:
+        sys.stderr.write(startup.report())
     gui.run()
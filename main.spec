@@ -1,11 +1,15 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+from PIL import Image
 
+os.makedirs('build', exist_ok=True)
+Image.open('trayicon.ico').resize((64, 64), Image.LANCZOS).save('build/trayicon_64.png')
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('trayicon.ico', '.')],
+    datas=[('trayicon.ico', '.'), ('build/trayicon_64.png', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+import main
+
+class ClockSource(main.ActivitySource):
+    finished = True
+
+    def __init__(self, now):
+        self.clock = now
+
+    def now(self):
+        return self.clock
+
+@pytest.fixture
+def write_trace(tmp_path):
+    def write(events, name="trace.jsonl"):
+        path = tmp_path / name
+        with path.open("w", encoding="utf-8") as f:
+            for ev in events:
+                f.write(json.dumps(ev) + "\n")
+        return path
+    return write
+
+@pytest.fixture
+def write_settings():
+    def write(data_dir, settings):
+        data_dir.mkdir(parents=True, exist_ok=True)
+        (data_dir / main.SETTINGS_FILE.name).write_text(json.dumps(settings), encoding="utf-8")
+    return write
+
+def wait_loaded(tracker, timeout=10):
+    import time
+    deadline = time.time() + timeout
+    while not tracker.intervals.loaded and time.time() < deadline:
+        time.sleep(0.01)
+    assert tracker.intervals.loaded
@@ -0,0 +1,40 @@
+import http.client
+import json
+
+import pytest
+
+import main
+from tests.conftest import ClockSource
+
+@pytest.fixture
+def server(tmp_path):
+    tracker = main.AppTracker(ClockSource(1_700_000_000.0), tmp_path)
+    server = main.start_query_server(tracker, port=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+    tracker.stop()
+
+def request(server, method, path, headers=None, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        conn.request(method, path, body=body, headers={"Host": "127.0.0.1", **(headers or {})})
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read())
+    finally:
+        conn.close()
+
+def test_get_requires_the_token(server):
+    assert request(server, "GET", "/current")[0] == 403
+    assert request(server, "GET", "/current", {main.API_TOKEN_HEADER: "wrong"})[0] == 403
+    assert request(server, "GET", "/current", {main.API_TOKEN_HEADER: server.token})[0] == 200
+
+def test_foreign_host_is_refused_even_with_the_token(server):
+    status, body = request(server, "GET", "/current", {"Host": "evil.example", main.API_TOKEN_HEADER: server.token})
+    assert status == 403 and body["error"] == "forbidden host"
+
+def test_post_requires_json_and_the_token(server):
+    token = {main.API_TOKEN_HEADER: server.token}
+    assert request(server, "POST", "/settings", token, "{}")[0] == 415
+    assert request(server, "POST", "/settings", {"Content-Type": "application/json"}, "{}")[0] == 403
+    assert request(server, "POST", "/settings", {"Content-Type": "application/json", **token}, "{}")[0] == 200
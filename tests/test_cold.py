@@ -0,0 +1,162 @@
+import itertools
+import json
+import random
+
+import pytest
+
+import main
+from tests.conftest import ClockSource, wait_loaded
+
+DAY = 86400
+
+def make_rows(days, seed=0, start=1_700_000_000.0):
+    rng = random.Random(seed)
+    rows = []
+    t = start
+    while t < start + days * DAY:
+        d = round(rng.expovariate(1 / 60) * 4) / 4 + 0.25
+        rows.append((f"app{int(rng.paretovariate(1.2)) % 40}.exe", t, t + d))
+        t += d + (rng.random() < 0.05) * round(rng.expovariate(1 / 900))
+    return rows
+
+def brute_totals(rows, start=None, end=None):
+    totals = {}
+    for app, s, e in rows:
+        s = s if start is None else max(s, start)
+        e = e if end is None else min(e, end)
+        if e > s:
+            totals[app] = totals.get(app, 0.0) + (e - s)
+    return totals
+
+def assert_totals(got, expected, tol=1e-3):
+    assert set(got) == set(expected)
+    for app, seconds in expected.items():
+        assert got[app] == pytest.approx(seconds, abs=tol)
+
+def test_block_round_trip_is_millisecond_exact():
+    rows = [("a.exe", 1.5, 2.25), ("é.exe", 2.25, 99.001), ("a.exe", 120.0, 120.0)]
+    assert main.decode_cold_block(main.encode_cold_block(list(rows))) == rows
+
+@pytest.mark.parametrize("codec", sorted(main.COLD_CODECS))
+def test_seal_totals_and_intervals_match_brute_force(tmp_path, codec):
+    rows = make_rows(5)
+    store = main.ColdStore(tmp_path / "cold", codec)
+    cutoff = rows[-1][2] + 1
+    blocks, sealed, written = store.seal(list(rows), cutoff)
+    assert sealed == len(rows) and blocks == len(store.blocks) >= 5 and written == store.size()
+    assert list(store.intervals()) == rows
+    rng = random.Random(4)
+    lo, hi = rows[0][1], rows[-1][2]
+    for start, end in [(None, None)] + [tuple(sorted((rng.uniform(lo, hi), rng.uniform(lo, hi)))) for _ in range(20)]:
+        assert_totals(store.totals(start, end), brute_totals(rows, start, end))
+        assert list(store.intervals(start, end)) == [r for r in rows if (start is None or r[2] > start) and (end is None or r[1] < end)]
+    reopened = main.ColdStore(tmp_path / "cold", codec)
+    assert reopened.sealed_until == cutoff
+    assert_totals(reopened.totals(), brute_totals(rows))
+
+def test_intervals_decode_lazily_in_time_order(tmp_path, monkeypatch):
+    rows = make_rows(6)
+    store = main.ColdStore(tmp_path / "cold")
+    middle = rows[len(rows) // 2][2]
+    store.seal([r for r in rows if r[2] <= middle], middle)
+    store.seal(list(rows), rows[-1][2])
+    decoded = []
+    read = store._read
+    monkeypatch.setattr(store, "_read", lambda block: decoded.append(block) or read(block))
+    first = list(itertools.islice(store.intervals(), 10))
+    assert first == rows[:10]
+    assert len(decoded) == 1
+    decoded.clear()
+    assert list(store.intervals()) == rows
+    assert len(decoded) == len(store.blocks)
+
+def test_sessions_stop_decoding_at_the_limit(tmp_path, write_settings, monkeypatch):
+    rows = make_rows(6)
+    data_dir = tmp_path / "data"
+    write_settings(data_dir, {"segment_history": 1, "cold_after_days": 1})
+    tracker = main.AppTracker(ClockSource(rows[-1][2] + DAY), data_dir)
+    try:
+        tracker.cold.seal(list(rows), rows[-1][2])
+        wait_loaded(tracker)
+        decoded = []
+        read = tracker.cold._read
+        monkeypatch.setattr(tracker.cold, "_read", lambda block: decoded.append(block) or read(block))
+        assert main.QueryAPI(tracker).sessions(limit=5) == [list(r) for r in rows[:5]]
+        assert len(decoded) == 1
+    finally:
+        tracker.stop()
+
+def test_resealing_the_same_rows_is_a_no_op(tmp_path):
+    rows = make_rows(2)
+    store = main.ColdStore(tmp_path / "cold")
+    cutoff = rows[len(rows) // 2][2]
+    store.seal(list(rows), cutoff)
+    size = store.size()
+    assert store.seal(list(rows), cutoff)[:2] == (0, 0)
+    assert store.size() == size
+    store.seal(list(rows), rows[-1][2])
+    assert_totals(store.totals(), brute_totals(rows))
+
+def test_drop_before_removes_expired_blocks_and_packs(tmp_path):
+    rows = make_rows(40, start=1_700_000_000.0)
+    store = main.ColdStore(tmp_path / "cold")
+    store.seal(list(rows), rows[-1][2])
+    packs = len(list((tmp_path / "cold").glob("pack-*.bin")))
+    cutoff = rows[0][1] + 35 * DAY
+    dropped, reclaimed = store.drop_before(cutoff)
+    assert dropped and reclaimed > 0
+    assert len(list((tmp_path / "cold").glob("pack-*.bin"))) < packs
+    assert all(b["end"] > cutoff for b in store.blocks)
+    kept = [r for r in rows if any(b["start"] <= r[1] and r[2] <= b["end"] for b in store.blocks)]
+    assert list(store.intervals()) == kept
+
+@pytest.mark.parametrize("backend", ["segment_history", "history_db"])
+def test_retention_seal_preserves_range_totals(tmp_path, write_settings, backend):
+    rows = make_rows(12)
+    now = rows[-1][2] + 60
+    data_dir = tmp_path / "data"
+    write_settings(data_dir, {backend: 1})
+    if backend == "segment_history":
+        store = main.SegmentStore(data_dir / "segments")
+        for row in rows:
+            store.add(*row)
+        store.flush()
+        store.close()
+    else:
+        history = main.HistoryStore(data_dir / "history.db")
+        for row in rows:
+            history.add_segment(*row)
+        history.close()
+    write_settings(data_dir, {backend: 1, "cold_after_days": 5})
+    tracker = main.AppTracker(ClockSource(now), data_dir)
+    wait_loaded(tracker)
+    ranges = [(rows[0][1], now), (rows[0][1] + 3 * DAY + 1234, rows[0][1] + 9 * DAY + 77), (now - 6 * DAY, now - 4 * DAY)]
+    before = [tracker.range_totals(a, b) for a, b in ranges]
+    stats = tracker.run_retention(now)
+    assert stats["cold_rows"] > 0 and stats["bytes_reclaimed"] > 0
+    for (a, b), expected in zip(ranges, before):
+        assert_totals(tracker.range_totals(a, b), expected)
+    assert tracker.run_retention(now)["cold_rows"] == 0
+    tracker.stop()
+    restarted = main.AppTracker(ClockSource(now), data_dir)
+    wait_loaded(restarted)
+    assert_totals(restarted.range_totals(*ranges[0]), before[0])
+    restarted.stop()
+
+def test_session_straddling_the_seal_cutoff_is_counted_once(tmp_path, write_settings):
+    now = 1_750_000_000.0
+    settings = {"segment_history": 1, "cold_after_days": 30}
+    data_dir = tmp_path / "data"
+    write_settings(data_dir, settings)
+    cutoff = main.retention_cutoff(settings, "cold_after_days", now, "day")
+    tracker = main.AppTracker(ClockSource(now), data_dir)
+    wait_loaded(tracker)
+    tracker._persist(("Idle Time", cutoff - 7200, cutoff + 7200, ""))
+    tracker.segments.flush()
+    window = (cutoff - DAY, cutoff + DAY)
+    assert tracker.range_totals(*window) == {"Idle Time": 14400.0}
+    tracker.run_retention(now)
+    assert tracker.range_totals(*window) == {"Idle Time": 14400.0}
+    sessions = main.QueryAPI(tracker).sessions(str(window[0]), str(window[1]))
+    assert sum(e - s for _, s, e in sessions) == 14400.0
+    tracker.stop()
@@ -0,0 +1,40 @@
+import main
+
+def test_block_beats_allow():
+    f = main.AppFilter(["game*.exe", "editor.exe"], ["gamebar.exe"])
+    assert f.decide("game1.exe")
+    assert not f.decide("gamebar.exe")
+    assert f.decide("Editor.EXE")
+    assert not f.decide("other.exe")
+
+def test_empty_allow_list_allows_everything_not_blocked():
+    f = main.AppFilter([], ["re:^steam.*\\.exe$"])
+    assert f.decide("notepad.exe")
+    assert not f.decide("steamwebhelper.exe")
+
+def test_name_glob_regex_and_path_rules():
+    f = main.AppFilter(["code.exe", "tool?.exe", "re:^py(thon)?\\d*\\.exe$", "C:\\Games\\*", "D:/Apps/run.exe"])
+    assert f.decide("CODE.exe")
+    assert f.decide("tool1.exe") and not f.decide("tool12.exe")
+    assert f.decide("python3.exe") and f.decide("py.exe") and not f.decide("pyx.exe")
+    assert f.decide("x.exe", "c:\\games\\x\\x.exe")
+    assert not f.decide("x.exe", "C:\\Other\\x.exe")
+    assert f.decide("run.exe", "d:\\apps\\RUN.exe")
+    assert not f.decide("run.exe", "D:\\Apps\\sub\\run.exe")
+    assert not f.decide("run.exe")
+
+def test_path_block_overrides_name_allow():
+    f = main.AppFilter(["x.exe"], ["C:\\Games\\*"])
+    assert f.decide("x.exe", "C:\\Tools\\x.exe")
+    assert not f.decide("x.exe", "C:\\Games\\x.exe")
+
+def test_invalid_regex_is_reported_and_skipped():
+    f = main.AppFilter(["re:([", "ok.exe"])
+    assert f.errors and f.errors[0].startswith("re:([")
+    assert f.decide("ok.exe")
+    assert not f.decide("([")
+
+def test_decisions_are_cached():
+    f = main.AppFilter(["a*.exe"])
+    assert f.decide("ab.exe") and f.decide("ab.exe")
+    assert f.hits == 1 and f.misses == 1
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+import main
+
+def write_machine(root, name, data, last_used):
+    path = root / name
+    path.mkdir(parents=True, exist_ok=True)
+    main.write_snapshot(data, last_used, 0, path)
+    return path
+
+@pytest.fixture
+def machines(tmp_path):
+    rng = random.Random(0)
+    states = {}
+    for m in range(12):
+        data = {f"app{rng.randrange(30)}.exe": float(rng.randrange(1, 10000)) for _ in range(15)}
+        last_used = {app: 1.7e9 + rng.randrange(10 ** 6) for app in data}
+        states[f"pc{m:02d}"] = (data, last_used)
+    paths = [write_machine(tmp_path / "src", name, *state) for name, state in states.items()]
+    return paths, states
+
+def expected_merge(states):
+    merged = {}
+    for data, last_used in states.values():
+        for app, total in data.items():
+            old = merged.get(app, (0.0, 0.0))
+            merged[app] = (old[0] + total, max(old[1], last_used[app]))
+    return sorted((app, total, last) for app, (total, last) in merged.items())
+
+def test_merge_sums_machines(tmp_path, machines):
+    paths, states = machines
+    fleet = main.FleetStore(tmp_path / "fleet", workers=2)
+    stats = fleet.ingest(paths)
+    assert stats["machines"] == 12 and not stats["errors"]
+    assert list(fleet.merged()) == expected_merge(states)
+
+def test_reingest_is_idempotent_and_order_independent(tmp_path, machines):
+    paths, states = machines
+    fleet = main.FleetStore(tmp_path / "fleet", workers=2)
+    fleet.ingest(paths[6:])
+    fleet.ingest(paths)
+    fleet.ingest(list(reversed(paths)))
+    assert list(fleet.merged()) == expected_merge(states)
+
+def test_reingesting_an_older_file_never_lowers_totals(tmp_path, machines):
+    paths, states = machines
+    fleet = main.FleetStore(tmp_path / "fleet", workers=2)
+    fleet.ingest(paths)
+    data, last_used = states["pc00"]
+    older = {app: total / 2 for app, total in data.items()}
+    stale = write_machine(tmp_path / "old", "pc00", older, {app: ts - 100 for app, ts in last_used.items()})
+    fleet.ingest([stale])
+    assert list(fleet.merged()) == expected_merge(states)
+    grown = {app: total + 60 for app, total in data.items()}
+    fleet.ingest([write_machine(tmp_path / "new", "pc00", grown, last_used)])
+    states["pc00"] = (grown, last_used)
+    assert list(fleet.merged()) == expected_merge(states)
+
+def test_multi_pass_merge_matches_single_pass(tmp_path, machines, monkeypatch):
+    paths, states = machines
+    monkeypatch.setattr(main, "FLEET_FANIN", 3)
+    fleet = main.FleetStore(tmp_path / "fleet", workers=2)
+    fleet.ingest(paths)
+    got = list(fleet.merged())
+    expected = expected_merge(states)
+    assert [row[0] for row in got] == [row[0] for row in expected]
+    for (_, total, last), (_, want_total, want_last) in zip(got, expected):
+        assert total == pytest.approx(want_total) and last == want_last
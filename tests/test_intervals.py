@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+import main
+from tests.conftest import ClockSource
+
+def make_rows(n, seed=0, apps=12):
+    rng = random.Random(seed)
+    rows = []
+    t = 1000.0
+    for _ in range(n):
+        d = rng.choice([0.5, 3.0, 40.0, 900.0, 5000.0])
+        rows.append((f"app{rng.randrange(apps)}.exe", t, t + d))
+        t += d + rng.choice([0.0, 0.0, 2.0, 600.0])
+    return rows
+
+def brute_totals(rows, start, end):
+    totals = {}
+    for app, s, e in rows:
+        s = s if start is None else max(s, start)
+        e = e if end is None else min(e, end)
+        if e > s:
+            totals[app] = totals.get(app, 0.0) + (e - s)
+    return totals
+
+def assert_totals(got, expected):
+    assert set(got) == set(expected)
+    for app, seconds in expected.items():
+        assert got[app] == pytest.approx(seconds, abs=1e-6)
+
+@pytest.fixture
+def indexed():
+    rows = make_rows(3000)
+    index = main.IntervalIndex()
+    shuffled = rows[:]
+    random.Random(1).shuffle(shuffled[-50:])
+    for row in shuffled[:-50]:
+        index.add(*row)
+    for row in shuffled[-50:]:
+        index.add(*row)
+    return rows, index
+
+def test_totals_and_app_time_match_brute_force(indexed):
+    rows, index = indexed
+    rng = random.Random(2)
+    lo, hi = rows[0][1], rows[-1][2]
+    ranges = [(None, None), (lo - 10, hi + 10)] + [tuple(sorted((rng.uniform(lo, hi), rng.uniform(lo, hi)))) for _ in range(60)]
+    ranges += [(s, s + rng.choice([1.0, 30.0, 3600.0])) for s in (rng.uniform(lo, hi) for _ in range(60))]
+    for start, end in ranges:
+        expected = brute_totals(rows, start, end)
+        assert_totals(index.totals(start, end), expected)
+        for app in ("app0.exe", "app5.exe", "missing.exe"):
+            assert index.app_time(app, start, end) == pytest.approx(expected.get(app, 0.0), abs=1e-6)
+
+def test_app_at_and_overlapping_match_brute_force(indexed):
+    rows, index = indexed
+    rng = random.Random(3)
+    for _ in range(300):
+        ts = rng.uniform(rows[0][1] - 5, rows[-1][2] + 5)
+        found = [r for r in rows if r[1] <= ts < r[2]]
+        assert index.app_at(ts) == (found[0] if found else None)
+    for _ in range(50):
+        start = rng.uniform(rows[0][1], rows[-1][2])
+        end = start + rng.uniform(0, 20000)
+        assert index.overlapping(start, end) == [r for r in rows if r[2] > start and r[1] < end]
+    assert len(index.overlapping(None, None, limit=7)) == 7
+
+def test_seed_keeps_live_sessions_after_the_persisted_horizon():
+    rows = make_rows(500)
+    live = [("live.exe", rows[-1][2] + 1, rows[-1][2] + 11), ("live.exe", rows[-1][2] + 20, rows[-1][2] + 25)]
+    index = main.IntervalIndex()
+    index.add(*rows[-1])
+    for row in live:
+        index.add(*row)
+    index.seed(iter(rows))
+    assert index.loaded
+    assert len(index) == len(rows) + len(live)
+    assert_totals(index.totals(), brute_totals(rows + live, None, None))
+
+def test_drop_before_clips_straddling_sessions_to_floor():
+    index = main.IntervalIndex()
+    index.add("a.exe", 0, 100)
+    index.add("b.exe", 100, 300)
+    index.add("c.exe", 300, 400)
+    assert index.drop_before(150, 200) == 1
+    assert index.overlapping() == [("b.exe", 200, 300), ("c.exe", 300, 400)]
+    assert_totals(index.totals(), {"b.exe": 100, "c.exe": 100})
+
+def test_no_index_without_persisted_history(tmp_path):
+    tracker = main.AppTracker(ClockSource(1_700_000_000.0), tmp_path)
+    try:
+        assert tracker.intervals is None
+        tracker._observe(1_700_000_000.0, 0, "a.exe")
+        tracker._observe(1_700_000_060.0, 0, "b.exe")
+        assert tracker.app_at(1_700_000_030.0) is None
+        assert tracker.app_at(1_700_000_090.0) == ("b.exe", 1_700_000_060.0, None)
+        with pytest.raises(ValueError):
+            main.QueryAPI(tracker).sessions()
+    finally:
+        tracker.stop()
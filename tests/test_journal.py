@@ -0,0 +1,82 @@
+import json
+
+import main
+from tests.conftest import ClockSource, wait_loaded
+
+def test_replay_skips_truncated_last_line(tmp_path):
+    journal = main.SessionJournal(tmp_path / "journal.jsonl", tmp_path / "journal.jsonl.old")
+    journal.write_many([journal.entry("a.exe", 0.0, 10.0), journal.entry("b.exe", 10.0, 25.0)])
+    journal.close()
+    with (tmp_path / "journal.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"seq":3,"app":"a.exe","sta')
+    data, last_used, rollups, seq = main.load_state_with_journal(tmp_path, compact=False)
+    assert data == {"a.exe": 10.0, "b.exe": 15.0}
+    assert last_used == {"a.exe": 10.0, "b.exe": 25.0}
+    assert seq == 2
+    assert rollups.totals("hour", main.rollup_start("hour", 0), main.next_rollup_boundary("hour", 0)) == data
+
+def test_records_after_a_truncated_line_survive_restart(tmp_path):
+    journal = main.SessionJournal(tmp_path / "journal.jsonl", tmp_path / "journal.jsonl.old")
+    journal.write_many([journal.entry("a.exe", 0.0, 10.0)])
+    journal.close()
+    with (tmp_path / "journal.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"seq":2,"app":"b.ex')
+    tracker = main.AppTracker(main.ActivitySource(), tmp_path)
+    tracker.journal.write_many([tracker.journal.entry("c.exe", 20.0, 30.0)])
+    tracker.running = False
+    tracker.writer.close()
+    tracker.journal.close()
+    data, _, _, _ = main.load_state_with_journal(tmp_path, compact=False)
+    assert data == {"a.exe": 10.0, "c.exe": 10.0}
+
+def test_open_record_is_applied_once(tmp_path):
+    journal = main.SessionJournal(tmp_path / "journal.jsonl", tmp_path / "journal.jsonl.old")
+    journal.write_many([
+        journal.entry("a.exe", 0.0, 5.0, is_open=True),
+        journal.entry("a.exe", 0.0, 8.0, is_open=True),
+        journal.entry("a.exe", 0.0, 9.0),
+        journal.entry("b.exe", 9.0, 12.0, is_open=True),
+    ])
+    journal.close()
+    data, _, _, _ = main.load_state_with_journal(tmp_path, compact=False)
+    assert data == {"a.exe": 9.0, "b.exe": 3.0}
+
+def test_snapshot_seq_skips_compacted_records(tmp_path):
+    main.write_snapshot({"a.exe": 100.0}, {"a.exe": 50.0}, 7, tmp_path)
+    with (tmp_path / "journal.jsonl").open("w", encoding="utf-8") as f:
+        f.write(json.dumps({"seq": 7, "app": "a.exe", "start": 40.0, "end": 50.0}) + "\n")
+        f.write(json.dumps({"seq": 8, "app": "a.exe", "start": 50.0, "end": 60.0}) + "\n")
+    data, last_used, _, seq = main.load_state_with_journal(tmp_path, compact=False)
+    assert data == {"a.exe": 110.0}
+    assert last_used == {"a.exe": 60.0}
+    assert seq == 8
+
+def crash(tracker):
+    tracker.writer.close()
+    tracker.journal.close()
+    if tracker.segments is not None:
+        tracker.segments.close()
+
+def test_unflushed_history_rows_are_rebuilt_from_the_journal(tmp_path, write_settings):
+    write_settings(tmp_path, {"segment_history": 1, "history_db": 1})
+    now = 1_750_000_000.0
+    tracker = main.AppTracker(ClockSource(now), tmp_path)
+    wait_loaded(tracker)
+    for i, app in enumerate(["a.exe", "b.exe", "a.exe", "c.exe"]):
+        tracker._observe(now + 60 * i, 0, app)
+    tracker.segments.flush()
+    tracker.history.flush()
+    for i, app in enumerate(["b.exe", "a.exe", "c.exe"], start=4):
+        tracker._observe(now + 60 * i, 0, app)
+    assert tracker.segments.pending and tracker.history._pending
+    crash(tracker)
+    expected = {"a.exe": 180.0, "b.exe": 120.0, "c.exe": 60.0}
+    for _ in range(2):
+        restarted = main.AppTracker(ClockSource(now + 600), tmp_path)
+        wait_loaded(restarted)
+        window = (now - 60, now + 600)
+        assert restarted.segments.totals(*window) == expected
+        assert dict(restarted.history.top_apps(*window, -1)) == expected
+        assert {app: total for app, total, _ in restarted.history.totals().fetchall()} == expected
+        assert restarted.intervals.totals(*window) == expected
+        crash(restarted)
@@ -0,0 +1,99 @@
+import shutil
+import subprocess
+import time
+
+import pytest
+
+import main
+
+psutil = pytest.importorskip("psutil")
+
+pytestmark = pytest.mark.skipif(shutil.which("sh") is None, reason="needs sh")
+
+@pytest.fixture
+def shell():
+    shell = subprocess.Popen(["sh", "-c", "sleep 30; :"])
+    yield shell
+    if shell.poll() is None:
+        shell.kill()
+        shell.wait()
+
+def child_of(shell):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        children = psutil.Process(shell.pid).children()
+        if children:
+            return children[0]
+        time.sleep(0.01)
+    pytest.fail("sh did not start sleep")
+
+def test_children_resolve_to_the_group_of_their_root(shell):
+    sleeper = child_of(shell)
+    index = main.ProcessIndex({"Test root": [psutil.Process().name()]})
+    index.refresh()
+    assert index.group(sleeper.pid, sleeper.create_time()) == "Test root"
+    assert index.group(shell.pid) == "Test root"
+    ungrouped = main.ProcessIndex({"Test root": ["no-such-root.exe"]})
+    assert ungrouped.group(sleeper.pid) == sleeper.name()
+
+def test_exited_processes_leave_the_index(shell):
+    sleeper = child_of(shell)
+    index = main.ProcessIndex({"Test root": [psutil.Process().name()]})
+    index.refresh()
+    assert sleeper.pid in index._procs and shell.pid in index._procs
+    shell.kill()
+    shell.wait()
+    sleeper.kill()
+    sleeper.wait(5)
+    index.refresh()
+    assert sleeper.pid not in index._procs and shell.pid not in index._procs
+
+@pytest.fixture
+def win32process(monkeypatch):
+    import sys
+    import types
+    module = types.SimpleNamespace(GetWindowThreadProcessId=lambda hwnd: (0, hwnd))
+    monkeypatch.setitem(sys.modules, "win32process", module)
+    return module
+
+@pytest.fixture
+def twin_sleepers(tmp_path):
+    sleep = shutil.which("sleep")
+    if sleep is None:
+        pytest.skip("needs sleep")
+    procs = []
+    for sub in ("a", "b"):
+        (tmp_path / sub).mkdir()
+        exe = shutil.copy(sleep, tmp_path / sub / "sleep")
+        procs.append(subprocess.Popen([exe, "30"]))
+    yield procs
+    for proc in procs:
+        proc.kill()
+        proc.wait()
+
+def test_same_named_processes_keep_their_own_paths(win32process, twin_sleepers):
+    cache = main.ProcessNameCache()
+    a, b = twin_sleepers
+    assert cache.resolve(a.pid) == cache.resolve(b.pid) == "sleep"
+    assert cache.path("sleep") == psutil.Process(b.pid).exe()
+    assert cache.resolve(a.pid) == "sleep"
+    assert cache.path("sleep") == psutil.Process(a.pid).exe()
+    assert cache.path("other") is None
+
+def test_grouped_processes_report_the_foreground_path(win32process, twin_sleepers):
+    cache = main.ProcessNameCache()
+    cache.set_index(main.ProcessIndex({"Test root": [psutil.Process().name()]}))
+    for proc in twin_sleepers:
+        assert cache.resolve(proc.pid) == "Test root"
+        assert cache.path("Test root") == psutil.Process(proc.pid).exe()
+
+def test_paths_are_evicted_with_names(win32process, twin_sleepers):
+    cache = main.ProcessNameCache(maxsize=1)
+    a, b = twin_sleepers
+    cache.resolve(a.pid)
+    cache.resolve(b.pid)
+    assert list(cache._paths) == list(cache._names) == [(b.pid, psutil.Process(b.pid).create_time())]
+    b.kill()
+    b.wait()
+    cache.sweep()
+    assert not cache._paths and not cache._names
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import main
+from benchmark import generate_trace
+
+HOURS = 24.0
+
+def expected_totals(trace, idle_threshold):
+    totals = {}
+    def credit(app, start, end):
+        if app and end > start:
+            totals[app] = totals.get(app, 0.0) + (end - start)
+    app = idle_since = prev = None
+    with open(trace, encoding="utf-8") as f:
+        for line in f:
+            ev = json.loads(line)
+            t = float(ev["t"])
+            if prev is not None:
+                if idle_since is not None and idle_since + idle_threshold < t:
+                    cross = max(prev, idle_since + idle_threshold)
+                    credit(app, prev, cross)
+                    credit("Idle Time", cross, t)
+                else:
+                    credit(app, prev, t)
+            prev = t
+            if "app" in ev:
+                app = ev["app"] or None
+                idle_since = None
+            if "idle" in ev:
+                idle_since = t if ev["idle"] else None
+    return totals
+
+def switch_counts(trace):
+    switches = {}
+    with open(trace, encoding="utf-8") as f:
+        for line in f:
+            ev = json.loads(line)
+            if ev.get("app"):
+                switches[ev["app"]] = switches.get(ev["app"], 0) + 2
+            if ev.get("idle"):
+                switches["Idle Time"] = switches.get("Idle Time", 0) + 2
+    return switches
+
+@pytest.mark.parametrize("mode, idle_every, slack", [
+    ("push", 0, 0.0),
+    ("push", 3600.0, 0.0),
+    ("poll", 0, main.POLL_MAX_INTERVAL),
+    ("poll", 3600.0, main.POLL_MAX_INTERVAL),
+])
+def test_replay_matches_trace(tmp_path, mode, idle_every, slack):
+    trace = tmp_path / "trace.jsonl"
+    generate_trace(trace, 30, HOURS, idle_every=idle_every, seed=0)
+    data_dir = tmp_path / "data"
+    tracker = main.run_replay(trace, mode, data_dir)
+    expected = expected_totals(trace, tracker.idle_threshold)
+    assert sum(tracker.data.values()) == pytest.approx(HOURS * 3600, abs=1e-3)
+    assert set(tracker.data) == set(expected)
+    switches = switch_counts(trace)
+    for app, seconds in expected.items():
+        assert abs(tracker.data[app] - seconds) <= slack * switches.get(app, 0) + 1e-3, app
+    data, last_used, _, _ = main.load_state_with_journal(data_dir, compact=False)
+    assert data == tracker.data
+    assert last_used == tracker.last_used
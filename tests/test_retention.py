@@ -0,0 +1,121 @@
+import json
+import random
+
+import pytest
+
+import main
+from tests.conftest import ClockSource, wait_loaded
+
+DAY = 86400
+NOW = 1_750_000_000.0
+
+def local_midnight(ts):
+    lt = main.time.localtime(ts)
+    return main.time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday, 0, 0, 0, 0, 0, -1))
+
+@pytest.fixture
+def replayed(tmp_path, write_settings):
+    rng = random.Random(0)
+    rows = []
+    t = NOW - 120 * DAY
+    while t < NOW - 60:
+        age = (NOW - t) / DAY
+        app = f"old{rng.randrange(40)}.exe" if age > 70 else f"new{rng.randrange(10)}.exe"
+        d = min(rng.expovariate(1 / 1800), NOW - 60 - t)
+        rows.append((app, t, t + d))
+        t += d
+    data_dir = tmp_path / "data"
+    write_settings(data_dir, {"segment_history": 1, "history_db": 1})
+    data, last_used, rollups = {}, {}, main.Rollups()
+    segments = main.SegmentStore(data_dir / "segments")
+    history = main.HistoryStore(data_dir / "history.db")
+    for i, row in enumerate(rows):
+        main._apply_segment(data, last_used, *row)
+        rollups.add(*row)
+        segments.add(*row)
+        history.add_segment(*row)
+        if i % 1000 == 999:
+            segments.flush()
+    segments.flush()
+    segments.close()
+    history.close()
+    main.write_snapshot(data, last_used, 0, data_dir, rollups.to_json(0))
+    return data_dir, data, rows
+
+def test_retention_keeps_totals_and_archives_idle_apps(replayed, write_settings):
+    data_dir, full, _ = replayed
+    ranges = [(local_midnight(NOW - 100 * DAY), local_midnight(NOW - 90 * DAY)), (NOW - 20 * DAY + 1234, NOW - 5 * DAY), (local_midnight(NOW - 45 * DAY), NOW - DAY)]
+    tracker = main.AppTracker(ClockSource(NOW), data_dir)
+    wait_loaded(tracker)
+    before = [tracker.range_totals(a, b) for a, b in ranges]
+    tracker.stop()
+    write_settings(data_dir, {"segment_history": 1, "history_db": 1, "retention_raw_days": 30, "retention_hourly_days": 60, "archive_after_months": 2})
+    tracker = main.AppTracker(ClockSource(NOW), data_dir)
+    wait_loaded(tracker)
+    stats = tracker.run_retention(NOW)
+    assert stats["archived_apps"] == 40
+    assert stats["hour_buckets"] > 0 and stats["history_rows"] > 0 and stats["segment_files"] + stats["segments_merged"] >= 0
+    assert 0 < stats["max_lock_ms"] < 50
+    assert stats["bytes_reclaimed"] > 0
+    assert set(tracker.archive) == {a for a in full if a.startswith("old")}
+    assert set(tracker.data) == {a for a in full if a.startswith("new")}
+    assert min(tracker.rollups.buckets["hour"]) >= main.rollup_label("hour", main.retention_cutoff(tracker.settings, "retention_hourly_days", NOW, "day"))
+    for (a, b), expected in zip(ranges, before):
+        got = tracker.range_totals(a, b)
+        assert sum(got.values()) == pytest.approx(sum(expected.values()), abs=0.05)
+        for app, seconds in expected.items():
+            assert got.get(app, 0.0) == pytest.approx(seconds, abs=0.05)
+    rows, _ = tracker.export_rows()
+    assert sum(row[1] for row in rows) == pytest.approx(sum(full.values()), abs=0.05)
+    assert tracker.intervals.overlapping(None, NOW - 31 * DAY) == []
+    tracker.stop()
+    assert json.loads((data_dir / "retention.log").read_text().splitlines()[-1])["archived_apps"] == 40
+
+def test_archived_app_is_restored_when_it_returns(replayed, write_settings):
+    data_dir, full, _ = replayed
+    write_settings(data_dir, {"archive_after_months": 2})
+    tracker = main.AppTracker(ClockSource(NOW), data_dir)
+    tracker.run_retention(NOW)
+    tracker.stop()
+    tracker = main.AppTracker(ClockSource(NOW), data_dir)
+    assert "old5.exe" in tracker.archive and "old5.exe" not in tracker.data
+    tracker._observe(NOW, 0, "old5.exe")
+    tracker._observe(NOW + 10, 0, "new1.exe")
+    tracker.stop()
+    data, _, _, _ = main.load_state_with_journal(data_dir, compact=False)
+    assert data["old5.exe"] == pytest.approx(full["old5.exe"] + 10)
+    tracker = main.AppTracker(ClockSource(NOW + 20), data_dir)
+    assert tracker.data["old5.exe"] == pytest.approx(full["old5.exe"] + 10)
+    assert "old5.exe" not in tracker.archive
+    tracker.stop()
+
+def brute_totals(rows, start, end):
+    totals = {}
+    for app, s, e in rows:
+        overlap = min(e, end) - max(s, start)
+        if overlap > 0:
+            totals[app] = totals.get(app, 0.0) + overlap
+    return totals
+
+@pytest.mark.parametrize("start, end, bucket", [
+    (NOW - 100 * DAY + 5 * 3600 + 1017, NOW - 90 * DAY + 3 * 3600, DAY),
+    (NOW - 62 * DAY + 3333, NOW - 58 * DAY + 777, DAY),
+    (NOW - 40 * DAY + 1000, NOW - 35 * DAY + 2000, 3600),
+    (NOW - 32 * DAY + 777, NOW - 25 * DAY, 3600),
+])
+def test_partial_coarse_buckets_are_prorated(replayed, write_settings, start, end, bucket):
+    data_dir, _, rows = replayed
+    write_settings(data_dir, {"segment_history": 1, "history_db": 1, "retention_raw_days": 30, "retention_hourly_days": 60})
+    tracker = main.AppTracker(ClockSource(NOW), data_dir)
+    try:
+        wait_loaded(tracker)
+        tracker.run_retention(NOW)
+        got = tracker.range_totals(start, end)
+        assert sum(got.values()) == pytest.approx(end - start, abs=0.05)
+        for app, seconds in brute_totals(rows, start, end).items():
+            assert abs(got.get(app, 0.0) - seconds) <= 2 * bucket
+        with tracker.lock:
+            coarse = tracker.rollups.totals("hour", start, end)
+        assert sum(coarse.values()) <= end - start + 0.05
+    finally:
+        tracker.stop()
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+import main
+
+def fill(store, files=20, per_file=50):
+    rows = []
+    t = 1000.0
+    for i in range(files):
+        for j in range(per_file):
+            row = (f"app{(i * per_file + j) % 7}.exe", t, t + 30.0)
+            store.add(*row)
+            rows.append(row)
+            t += 40.0
+        store.flush()
+    return rows
+
+def brute(rows, start, end):
+    totals = {}
+    for app, s, e in rows:
+        overlap = min(e, end) - max(s, start)
+        if overlap > 0:
+            totals[app] = totals.get(app, 0.0) + overlap
+    return totals
+
+def test_held_readers_outlive_compaction_and_drops(tmp_path):
+    store = main.SegmentStore(tmp_path)
+    rows = fill(store)
+    held = store.readers()
+    paths = [reader.path for reader in held]
+    assert store.compact()[0] == len(paths)
+    cutoff = rows[len(rows) // 2][1] + 5.0
+    store.drop_before(cutoff, exact=True)
+    total = {}
+    for reader in held:
+        reader.totals(None, None, total)
+    assert total == pytest.approx(brute(rows, 0, float("inf")))
+    assert all(path.exists() for path in paths)
+    assert store.totals(cutoff, None) == pytest.approx(brute(rows, cutoff, float("inf")))
+    store.release(held)
+    assert not any(path.exists() for path in paths)
+    assert not store._doomed
+    assert store.totals(cutoff, None) == pytest.approx(brute(rows, cutoff, float("inf")))
+    store.close()
+
+def test_concurrent_totals_never_undercount(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "SEGMENT_ROWS", 120)
+    store = main.SegmentStore(tmp_path)
+    rows = fill(store, files=40, per_file=25)
+    cutoff = rows[len(rows) // 3][1] + 5.0
+    expected = brute(rows, cutoff, float("inf"))
+    done = threading.Event()
+    seen = []
+    errors = []
+    def read():
+        try:
+            while not done.is_set():
+                seen.append(store.totals(cutoff, None))
+        except Exception as e:
+            errors.append(e)
+    thread = threading.Thread(target=read)
+    thread.start()
+    try:
+        for _ in range(3):
+            store.compact()
+            store.drop_before(cutoff, exact=True)
+    finally:
+        done.set()
+        thread.join()
+    assert not errors
+    assert seen
+    for totals in seen:
+        assert totals == pytest.approx(expected)
+    store.close()
@@ -0,0 +1,113 @@
+import itertools
+import os
+import struct
+import subprocess
+import sys
+import time
+
+import pytest
+
+import main
+from benchmark import generate_trace
+
+_names = itertools.count()
+
+@pytest.fixture
+def shm_name():
+    return f"ase-test-{os.getpid()}-{next(_names)}"
+
+@pytest.fixture
+def tracker(tmp_path, shm_name):
+    trace = tmp_path / "trace.jsonl"
+    generate_trace(trace, 400, 24.0, 2.0, seed=4)
+    tracker = main.AppTracker(main.ReplaySource(trace, "poll"), tmp_path / "data")
+    with tracker.lock:
+        tracker.shared = main.SharedStatePublisher(shm_name)
+        tracker.shared.rebuild(tracker)
+    yield tracker
+    if tracker.shared is not None:
+        tracker.shared.close()
+
+READER = r"""
+import sys, time
+import main
+r = main.SharedStateReader(sys.argv[1])
+version = None
+seen = {}
+reads = 0
+print("ready", flush=True)
+while True:
+    c = r.changes_since(version)
+    version = c["version"]
+    reads += 1
+    if c["full"]:
+        seen = {}
+    for app, total, last, today in c["rows"]:
+        assert app.startswith("app") or app == "Idle Time", app
+        assert total is None or total >= 0
+        seen[app] = total
+    s = r.snapshot()
+    assert s.current_app is None or s.current_app.startswith("app") or s.current_app == "Idle Time", s
+    if time.time() > float(sys.argv[2]):
+        break
+print(reads, flush=True)
+"""
+
+def test_cross_process_reader_never_sees_torn_rows(tracker, shm_name, monkeypatch):
+    monkeypatch.setattr(main, "SHARED_MIN_ROWS", 16)
+    with tracker.lock:
+        tracker.shared.rebuild(tracker)
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(__file__)))
+    reader = subprocess.Popen([sys.executable, "-c", READER, shm_name, str(time.time() + 4)], stdout=subprocess.PIPE, text=True, env=env)
+    assert reader.stdout.readline().strip() == "ready"
+    tracker.track_loop()
+    out, _ = reader.communicate(timeout=30)
+    assert reader.returncode == 0
+    assert int(out) > 100
+    state = main.SharedStateReader(shm_name)
+    try:
+        change = state.changes_since()
+        assert change["full"]
+        assert {app: total for app, total, _, _ in change["rows"] if total is not None} == tracker.data
+        assert state.snapshot()[:2] == tracker.snapshot[:2]
+        assert state.generation > 1
+    finally:
+        state.close()
+
+def test_partial_updates_follow_the_change_log(tracker, shm_name):
+    state = main.SharedStateReader(shm_name)
+    try:
+        tracker.track_loop()
+        first = state.changes_since()
+        apps = sorted(tracker.data)[:2]
+        with tracker.lock:
+            for app in apps:
+                tracker.data[app] += 10.0
+            tracker.shared.publish(tracker, set(apps))
+        change = state.changes_since(first["version"])
+        assert not change["full"]
+        assert {row[0]: row[1] for row in change["rows"]} == {app: tracker.data[app] for app in apps}
+        again = state.changes_since(change["version"])
+        assert not again["full"] and again["rows"] == []
+        ahead = (change["version"][0], change["version"][1] + 5)
+        assert state.changes_since(ahead)["full"]
+        with tracker.lock:
+            tracker.shared.rebuild(tracker)
+        assert state.changes_since(change["version"])["full"]
+    finally:
+        state.close()
+
+def test_reader_refuses_a_write_in_progress(tracker, shm_name, monkeypatch):
+    monkeypatch.setattr(main, "SHARED_READ_RETRIES", 5)
+    state = main.SharedStateReader(shm_name)
+    try:
+        struct.pack_into("<Q", tracker.shared.block.buf, 0, tracker.shared.seq + 1)
+        with pytest.raises(BlockingIOError):
+            state.snapshot()
+        struct.pack_into("<Q", tracker.shared.block.buf, 0, tracker.shared.seq)
+        assert state.pid() == os.getpid()
+    finally:
+        state.close()
+
+def test_epoch_is_unique_per_process(tracker):
+    assert tracker.shared.epoch >> 32 == os.getpid()
@@ -0,0 +1,35 @@
+import random
+
+import main
+from tests.conftest import ClockSource
+
+def brute_top(rows, app, n):
+    totals = {}
+    for a, title, seconds in rows:
+        if app is None or a == app:
+            totals[(a, title)] = totals.get((a, title), 0.0) + seconds
+    return sorted(totals.items(), key=lambda item: -item[1])[:n]
+
+def test_titles_rank_outside_the_tracker_lock(tmp_path, write_settings):
+    write_settings(tmp_path, {"track_titles": 1})
+    tracker = main.AppTracker(ClockSource(1_700_000_000.0), tmp_path)
+    rng = random.Random(1)
+    rows = [(f"app{rng.randrange(5)}.exe", f"title {rng.randrange(300)}", float(rng.randrange(1, 10_000))) for _ in range(3000)]
+    t = 0.0
+    for app, title, seconds in rows:
+        tracker.titles.add(app, title, t, t + seconds)
+        t += seconds
+    api = main.QueryAPI(tracker)
+    held = []
+    rank = tracker.titles.rank
+    def checked(rows, n):
+        held.append(tracker.lock.locked())
+        return rank(rows, n)
+    tracker.titles.rank = checked
+    try:
+        for app in (None, "app3.exe", "missing.exe"):
+            got = api.titles(app, 7)
+            assert [(a, title, seconds) for a, title, seconds, _ in got] == [(a, title, seconds) for (a, title), seconds in brute_top(rows, app, 7)]
+        assert held == [False, False, False]
+    finally:
+        tracker.stop()
@@ -0,0 +1,48 @@
+import queue
+import threading
+import time
+import types
+
+import main
+
+class SlowStopQueue(queue.Queue):
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        if item[0] == "stop":
+            time.sleep(0.05)
+
+def test_appends_racing_close_are_not_lost(monkeypatch):
+    monkeypatch.setattr(main, "queue", types.SimpleNamespace(Queue=SlowStopQueue, Full=queue.Full, Empty=queue.Empty))
+    writer = main.PersistenceWorker()
+    written = []
+    lock = threading.Lock()
+    def sink(items):
+        with lock:
+            written.extend(items)
+    started = threading.Event()
+    def produce(base):
+        for i in range(2000):
+            writer.append(sink, base + i)
+            started.set()
+            time.sleep(0)
+    threads = [threading.Thread(target=produce, args=(n * 10000,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    started.wait()
+    writer.close()
+    for t in threads:
+        t.join()
+    assert sorted(written) == [n * 10000 + i for n in range(4) for i in range(2000)]
+
+def test_notify_coalesces_and_flush_waits():
+    writer = main.PersistenceWorker()
+    calls = []
+    gate = threading.Event()
+    writer.notify("block", gate.wait)
+    for i in range(5):
+        writer.notify("save", lambda i=i: calls.append(i))
+    gate.set()
+    assert writer.flush(5)
+    assert calls == [4]
+    assert writer.coalesced == 4
+    writer.close()